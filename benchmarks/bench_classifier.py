@@ -0,0 +1,105 @@
+"""
+Benchmark of title category classification.
+
+Classifies the same titles with keyword dictionaries of growing size, once
+with the compiled CategoryClassifier and once with the per-category
+substring scan analyze_title_for_category used before, and reports the time
+per title as JSON.
+
+    python benchmarks/bench_classifier.py --terms 36 1000 10000 --categories 100 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import string
+import argparse
+import platform
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main')
+if MAIN_DIR not in sys.path:
+    sys.path.insert(0, MAIN_DIR)
+
+from category_classifier import CategoryClassifier
+from hashtag_generator import CATEGORY_KEYWORDS
+from bench_metadata import make_titles
+
+def make_keywords(terms, categories, seed):
+    """CATEGORY_KEYWORDS plus random keywords, terms in total, spread over categories"""
+    rng = random.Random(seed)
+    keywords = {category: dict.fromkeys(words, 1) for category, words in CATEGORY_KEYWORDS.items()}
+    extra = max(0, terms - sum(len(words) for words in keywords.values()))
+    for index in range(extra):
+        category = f'niche_{index % max(1, categories - len(keywords)):03d}'
+        word = ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        keywords.setdefault(category, {})[word] = rng.randint(1, 3)
+    return keywords
+
+def substring_scan(keywords, titles):
+    """The old analyze_title_for_category: first category with any keyword in the title"""
+    results = []
+    for title in titles:
+        title_lower = title.lower()
+        for category, words in keywords.items():
+            if any(word in title_lower for word in words):
+                results.append(category)
+                break
+        else:
+            results.append('entertainment')
+    return results
+
+def _best_time(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--terms', type=int, nargs='+', default=[36, 1000, 10000])
+    parser.add_argument('--categories', type=int, default=100)
+    parser.add_argument('--titles', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles, args.seed)
+    results = []
+    for terms in args.terms:
+        keywords = make_keywords(terms, args.categories, args.seed)
+        start = time.perf_counter()
+        classifier = CategoryClassifier(keywords, default='entertainment')
+        build_time = time.perf_counter() - start
+        compiled = _best_time(lambda: [classifier.classify(title) for title in titles], args.repeat)
+        scan = _best_time(lambda: substring_scan(keywords, titles), args.repeat)
+        results.append({
+            'terms': sum(len(words) for words in keywords.values()),
+            'categories': len(keywords),
+            'states': classifier.states,
+            'build_s': build_time,
+            'compiled_per_title_us': compiled * 1e6 / len(titles),
+            'substring_scan_per_title_us': scan * 1e6 / len(titles),
+        })
+        print(f"{results[-1]['terms']} terms: compiled {results[-1]['compiled_per_title_us']:.1f} us/title, "
+              f"substring scan {results[-1]['substring_scan_per_title_us']:.1f} us/title", file=sys.stderr)
+
+    report = {
+        'benchmark': 'classifier',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'titles': args.titles,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Offline benchmark of download_shorts / crawl_channel.
+
+Every scenario (limit x max_workers) runs in a fresh process against the
+local fixture server (see local_media.py) and reports listing time,
+per-video latency, throughput, peak RSS and ffmpeg CPU time as JSON.
+
+    python benchmarks/bench_download.py --limits 5 20 --workers 1 4 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import platform
+import multiprocessing
+
+import local_media
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def run_scenario(base_url, limit, max_workers, sort_by, skip_duplicates):
+    """Run one crawl in this (fresh) process and return its metrics"""
+    # Keep stdout for the JSON report; the crawl's own output goes to stderr
+    sys.stdout = sys.stderr
+    local_media.LocalChannelIE.server_url = local_media.LocalVideoIE.server_url = base_url
+    import download
+    from archive import DownloadArchive
+
+    download._make_ydl = local_media.make_local_ydl
+    workdir = tempfile.mkdtemp(prefix='bench-download-')
+    os.chdir(workdir)
+    channel_url = 'https://www.youtube.com/@bench/shorts'
+
+    # Listing phase on its own (flat, lazy, stops at the limit)
+    start = time.perf_counter()
+    listing = download.iter_channel_entries(channel_url)
+    try:
+        listed = download.select_entries(listing, sort_by, limit)
+    finally:
+        listing.close()
+    listing_time = time.perf_counter() - start
+
+    # Full crawl with per-video timing
+    latencies = []
+    original_download_entry = download._download_entry
+
+    def timed_download_entry(*args, **kwargs):
+        entry_start = time.perf_counter()
+        try:
+            return original_download_entry(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - entry_start)
+
+    download._download_entry = timed_download_entry
+    archive = DownloadArchive(os.path.join(workdir, 'archive.db'))
+    start = time.perf_counter()
+    summary = download.crawl_channel(channel_url, output_folder=os.path.join(workdir, 'videos'),
+                                     sort_by=sort_by, limit=limit, max_workers=max_workers,
+                                     archive=archive, skip_duplicates=skip_duplicates)
+    total_time = time.perf_counter() - start
+    archive.close()
+
+    downloaded_bytes = sum(os.path.getsize(r['path']) for r in summary['results'] if r.get('path'))
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        'limit': limit,
+        'max_workers': max_workers,
+        'sort_by': sort_by,
+        'listed': len(listed),
+        'downloaded': summary['downloaded'],
+        'failed': summary['failed'],
+        'listing_time_s': listing_time,
+        'total_time_s': total_time,
+        'per_video_latency_s': {
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': _percentile(latencies, 0.5),
+            'p95': _percentile(latencies, 0.95),
+            'max': max(latencies) if latencies else None,
+        },
+        'videos_per_s': summary['downloaded'] / total_time if total_time else None,
+        'bytes_per_s': downloaded_bytes / total_time if total_time else None,
+        'peak_rss_mb': self_usage.ru_maxrss / 1024,
+        'ffmpeg_cpu_s': children_usage.ru_utime + children_usage.ru_stime,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limits', type=int, nargs='+', default=[5, 20])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--sort-by', choices=['views', 'date'], default='date')
+    parser.add_argument('--videos-per-channel', type=int, default=100)
+    parser.add_argument('--latency-ms', type=float, default=50, help='latency added to every API response')
+    parser.add_argument('--fixture-size-mb', type=int, default=4, help='size of the fixture when ffmpeg is missing')
+    parser.add_argument('--dedupe', action='store_true', help='include near-duplicate detection')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    fixtures_dir = tempfile.mkdtemp(prefix='bench-fixtures-')
+    fixtures = local_media.make_fixtures(fixtures_dir, size_mb=args.fixture_size_mb)
+    server, base_url = local_media.serve_fixtures(fixtures_dir, fixtures, args.videos_per_channel,
+                                                  args.latency_ms / 1000)
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    try:
+        for limit in args.limits:
+            for max_workers in args.workers:
+                with context.Pool(1) as pool:
+                    result = pool.apply(run_scenario, (base_url, limit, max_workers, args.sort_by, args.dedupe))
+                results.append(result)
+                print(f"limit={limit} workers={max_workers}: {result['total_time_s']:.2f}s, "
+                      f"{result['videos_per_s']:.2f} videos/s", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    report = {
+        'benchmark': 'download',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'yt_dlp': local_media.yt_dlp.version.__version__,
+        'fixtures': fixtures,
+        'latency_ms': args.latency_ms,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
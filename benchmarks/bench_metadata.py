@@ -0,0 +1,91 @@
+"""
+Benchmark of upload metadata generation.
+
+Times a generator built per title (the old generate_basic_metadata),
+generate_basic_metadata on the shared generator and generate_metadata_batch
+over the same titles, and reports the time per title as JSON.
+
+    python benchmarks/bench_metadata.py --titles 5000 --repeat 3 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main')
+if MAIN_DIR not in sys.path:
+    sys.path.insert(0, MAIN_DIR)
+
+from hashtag_generator import TrendingHashtagGenerator, generate_basic_metadata, generate_metadata_batch
+
+WORDS = ['funny', 'cat', 'morning', 'routine', 'minecraft', 'speedrun', 'recipe', 'street', 'food',
+         'phone', 'unboxing', 'challenge', 'dance', 'prank', 'epic', 'fail', 'travel', 'vlog', 'asmr']
+
+def make_titles(count, seed):
+    rng = random.Random(seed)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 8))) for _ in range(count)]
+
+def per_title_generator(titles):
+    """generate_basic_metadata as it was: a new generator for every title"""
+    results = []
+    for title in titles:
+        generator = TrendingHashtagGenerator()
+        viral_title = generator.generate_viral_title(title)
+        category = generator.analyze_title_for_category(title)
+        tags = generator.generate_hashtags(title, category)
+        results.append((generator.generate_description(viral_title, tags), tags))
+    return results
+
+def shared_generator(titles):
+    return [generate_basic_metadata(title) for title in titles]
+
+METHODS = {
+    'per_title_generator': per_title_generator,
+    'shared_generator': shared_generator,
+    'batch': generate_metadata_batch,
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--titles', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per method (the fastest one is reported)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    titles = make_titles(args.titles, args.seed)
+    results = []
+    for name, method in METHODS.items():
+        timings = []
+        for _ in range(args.repeat):
+            random.seed(args.seed)
+            start = time.perf_counter()
+            method(titles)
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        results.append({'method': name, 'total_s': best, 'per_title_us': best * 1e6 / len(titles)})
+        print(f"{name}: {best * 1e6 / len(titles):.1f} us/title", file=sys.stderr)
+
+    baseline = results[0]['total_s']
+    for result in results:
+        result['speedup'] = baseline / result['total_s'] if result['total_s'] else None
+
+    report = {
+        'benchmark': 'metadata',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'titles': args.titles,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""
+Offline benchmark of process_video_folder / upload_video.
+
+Every scenario (chunk size x concurrency) runs in a fresh process against
+the fake YouTube Data API (see fake_youtube.py) and reports videos per
+minute, bytes per second, retries, per-video latency percentiles and the
+server's request counters as JSON.
+
+    python benchmarks/bench_upload.py --chunk-sizes adaptive 1 8 --concurrency 1 3 --output bench.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import platform
+import functools
+import multiprocessing
+from urllib.request import Request, urlopen
+
+import fake_youtube
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+def _admin(base_url, path, data=None):
+    request = Request(base_url + path, data=json.dumps(data).encode() if data is not None else None,
+                      headers={'Content-Type': 'application/json'})
+    with urlopen(request) as response:
+        return json.load(response)
+
+def make_videos(folder, count, size_mb):
+    """Write count distinct files of size_mb random bytes; returns the total size"""
+    os.makedirs(folder, exist_ok=True)
+    for index in range(count):
+        with open(os.path.join(folder, f'bench_{index:04d}.mp4'), 'wb') as f:
+            f.write(os.urandom(int(size_mb * 1024 * 1024)))
+    return int(size_mb * 1024 * 1024) * count
+
+def run_scenario(base_url, videos, size_mb, chunk_mb, concurrency, options):
+    """Run one upload run in this (fresh) process and return its metrics"""
+    # Keep stdout for the JSON report; the uploads' own output goes to stderr
+    sys.stdout = sys.stderr
+    # The client-side ledger would otherwise stop after six uploads a day
+    os.environ['YT_DAILY_QUOTA'] = str(10 ** 9)
+    import upload
+    from upload_events import StateChanged, RunFinished, STARTED, RESUMED, RETRYING, RESTARTED, UPLOADED
+
+    if chunk_mb is not None:
+        chunk_size = int(chunk_mb * 1024 * 1024)
+        upload.AdaptiveChunkController = functools.partial(upload.AdaptiveChunkController, initial=chunk_size,
+                                                           minimum=chunk_size, maximum=chunk_size)
+    workdir = tempfile.mkdtemp(prefix='bench-upload-')
+    os.chdir(workdir)
+    folder = os.path.join(workdir, 'videos')
+    total_bytes = make_videos(folder, videos, size_mb)
+    _admin(base_url, '/_admin/reset', options)
+    youtube = fake_youtube.build_service(base_url)
+
+    started, latencies = {}, []
+    retries = restarts = 0
+    results = []
+    start = time.perf_counter()
+    for event in upload.iter_upload_events(youtube, folder, skip_duplicates=False,
+                                           max_concurrent_uploads=concurrency):
+        if isinstance(event, RunFinished):
+            results = event.results
+        elif isinstance(event, StateChanged):
+            if event.state in (STARTED, RESUMED):
+                started.setdefault(event.path, event.timestamp)
+            elif event.state == RETRYING:
+                retries += 1
+            elif event.state == RESTARTED:
+                restarts += 1
+            elif event.state == UPLOADED and event.path in started:
+                latencies.append(event.timestamp - started[event.path])
+    total_time = time.perf_counter() - start
+
+    uploaded = sum(1 for r in results if r['status'] == 'uploaded')
+    return {
+        'videos': videos,
+        'size_mb': size_mb,
+        'chunk_mb': chunk_mb if chunk_mb is not None else 'adaptive',
+        'concurrency': concurrency,
+        'uploaded': uploaded,
+        'failed': sum(1 for r in results if r['status'] == 'failed'),
+        'deferred': sum(1 for r in results if r['status'] == 'deferred'),
+        'retries': retries,
+        'restarts': restarts,
+        'total_time_s': total_time,
+        'videos_per_min': uploaded * 60 / total_time if total_time else None,
+        'bytes_per_s': total_bytes * uploaded / videos / total_time if total_time else None,
+        'per_video_latency_s': {
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': _percentile(latencies, 0.5),
+            'p95': _percentile(latencies, 0.95),
+            'p99': _percentile(latencies, 0.99),
+            'max': max(latencies) if latencies else None,
+        },
+        'server': _admin(base_url, '/_admin/stats'),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--videos', type=int, default=10)
+    parser.add_argument('--size-mb', type=float, default=8)
+    parser.add_argument('--chunk-sizes', nargs='+', default=['adaptive', '1', '8'],
+                        help="chunk sizes in MiB (multiples of 0.25), or 'adaptive'")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 3])
+    parser.add_argument('--latency-ms', type=float, default=20, help='latency added to every API response')
+    parser.add_argument('--max-mb-per-s', type=float, help='upload throughput cap shared by all uploads')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 5xx')
+    parser.add_argument('--error-status', type=int, default=503)
+    parser.add_argument('--quota-limit', type=int, help='server-side quota units before 403 quotaExceeded')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    options = {
+        'latency': args.latency_ms / 1000,
+        'max_bytes_per_s': args.max_mb_per_s * 1024 * 1024 if args.max_mb_per_s else None,
+        'error_rate': args.error_rate,
+        'error_status': args.error_status,
+        'quota_limit': args.quota_limit,
+        'seed': args.seed,
+    }
+    server, _, base_url = fake_youtube.serve_api()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    try:
+        for chunk in args.chunk_sizes:
+            chunk_mb = None if chunk == 'adaptive' else float(chunk)
+            for concurrency in args.concurrency:
+                with context.Pool(1) as pool:
+                    result = pool.apply(run_scenario, (base_url, args.videos, args.size_mb, chunk_mb, concurrency,
+                                                       options))
+                results.append(result)
+                print(f"chunk={result['chunk_mb']} concurrency={concurrency}: {result['total_time_s']:.2f}s, "
+                      f"{result['videos_per_min']:.1f} videos/min, {result['retries']} retries", file=sys.stderr)
+    finally:
+        server.shutdown()
+
+    report = {
+        'benchmark': 'upload',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'options': options,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
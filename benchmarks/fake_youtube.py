@@ -0,0 +1,360 @@
+"""
+Local stand-in for the YouTube Data API used by the upload benchmarks.
+
+serve_api() starts an HTTP server implementing resumable videos.insert,
+videos.list, channels.list, playlistItems.insert and batch requests, with
+configurable latency, a shared throughput cap, injected 5xx errors and a
+daily quota answered with 403 quotaExceeded. build_service() points a
+googleapiclient service built from the bundled discovery document at it,
+so main/upload.py runs unchanged on top of it.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from email.parser import BytesParser
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import googleapiclient.discovery
+import googleapiclient.http
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main')
+if MAIN_DIR not in sys.path:
+    sys.path.insert(0, MAIN_DIR)
+
+from quota import API_COSTS
+from youtube_client import discovery_document
+
+# Request bodies are read (and throttled) in blocks of this size
+READ_BLOCK = 64 * 1024
+
+DEFAULT_OPTIONS = {
+    'latency': 0.0,             # seconds added to every response
+    'max_bytes_per_s': None,    # upload throughput shared by all connections (None: unlimited)
+    'error_rate': 0.0,          # share of requests answered with error_status
+    'error_status': 503,
+    'quota_limit': None,        # quota units before 403 quotaExceeded (None: unlimited)
+    'processing_time': 0.0,     # seconds a video stays 'processing' after its upload
+    'seed': None,
+}
+
+class FakeYouTube:
+    """State of the fake API: upload sessions, videos, quota and request counters"""
+
+    def __init__(self, **options):
+        self._lock = threading.Lock()
+        self.reset(**options)
+
+    def reset(self, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
+        with self._lock:
+            self.options = dict(DEFAULT_OPTIONS, **options)
+            self._random = random.Random(self.options['seed'])
+            self._next_free = 0.0
+            self.sessions = {}
+            self.videos = {}
+            self.playlist_items = []
+            self.quota_used = 0
+            self.stats = {
+                'requests': {},
+                'injected_errors': 0,
+                'quota_errors': 0,
+                'upload_sessions': 0,
+                'upload_chunks': 0,
+                'status_queries': 0,
+                'bytes_received': 0,
+                'batch_requests': 0,
+            }
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def count_request(self, method):
+        with self._lock:
+            self.stats['requests'][method] = self.stats['requests'].get(method, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, requests=dict(self.stats['requests']), quota_used=self.quota_used,
+                        videos=len(self.videos), playlist_items=len(self.playlist_items))
+
+    def inject_error(self):
+        """Whether this request should fail with error_status"""
+        with self._lock:
+            if self.options['error_rate'] and self._random.random() < self.options['error_rate']:
+                self.stats['injected_errors'] += 1
+                return True
+            return False
+
+    def charge(self, method):
+        """Charge the quota of one call; False if the quota is used up"""
+        cost = API_COSTS.get(method, 1)
+        with self._lock:
+            limit = self.options['quota_limit']
+            if limit is not None and self.quota_used + cost > limit:
+                self.stats['quota_errors'] += 1
+                return False
+            self.quota_used += cost
+            return True
+
+    def throttle(self, nbytes):
+        """Block until nbytes fit in the shared throughput cap"""
+        rate = self.options['max_bytes_per_s']
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_free)
+            self._next_free = start + nbytes / rate
+            wait = self._next_free - now
+        time.sleep(wait)
+
+    def create_session(self, metadata, total):
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self.sessions[upload_id] = {'metadata': metadata, 'total': total, 'received': 0}
+            self.stats['upload_sessions'] += 1
+        return upload_id
+
+    def finish_upload(self, upload_id):
+        """Turn a complete upload session into a video resource"""
+        video_id = uuid.uuid4().hex[:11]
+        with self._lock:
+            session = self.sessions.pop(upload_id)
+            metadata = session['metadata']
+            video = {
+                'kind': 'youtube#video',
+                'id': video_id,
+                'snippet': metadata.get('snippet', {}),
+                'status': dict(metadata.get('status', {}), uploadStatus='uploaded'),
+                '_uploaded_at': time.monotonic(),
+                '_size': session['received'],
+            }
+            self.videos[video_id] = video
+        return self.video_resource(video)
+
+    def video_resource(self, video, parts=('snippet', 'status')):
+        resource = {'kind': video['kind'], 'id': video['id']}
+        processing = time.monotonic() - video['_uploaded_at'] < self.options['processing_time']
+        if 'snippet' in parts:
+            resource['snippet'] = video['snippet']
+        if 'status' in parts:
+            resource['status'] = dict(video['status'], uploadStatus='uploaded' if processing else 'processed')
+        if 'processingDetails' in parts:
+            resource['processingDetails'] = {'processingStatus': 'processing' if processing else 'succeeded'}
+        return resource
+
+def _error_body(status, reason, message):
+    return {'error': {'code': status, 'message': message,
+                      'errors': [{'reason': reason, 'domain': 'youtube.quota' if reason == 'quotaExceeded' else 'global',
+                                  'message': message}]}}
+
+def _handle_api(api, method, path, query, body):
+    """
+    Answer a (non-upload) API call
+    Returns (status, headers, JSON-serializable body); used for plain and batched requests.
+    """
+    name = {
+        ('GET', '/youtube/v3/videos'): 'videos.list',
+        ('GET', '/youtube/v3/channels'): 'channels.list',
+        ('POST', '/youtube/v3/playlistItems'): 'playlistItems.insert',
+    }.get((method, path))
+    if name is None:
+        return 404, {}, _error_body(404, 'notFound', f"No fake endpoint for {method} {path}")
+    api.count_request(name)
+    if api.inject_error():
+        status = api.options['error_status']
+        return status, {}, _error_body(status, 'backendError', 'Injected error')
+    if not api.charge(name):
+        return 403, {}, _error_body(403, 'quotaExceeded', 'The request cannot be completed because you have exceeded your quota.')
+
+    if name == 'videos.list':
+        parts = query.get('part', [''])[0].split(',')
+        ids = [video_id for video_id in query.get('id', [''])[0].split(',') if video_id]
+        with api._lock:
+            items = [api.video_resource(api.videos[video_id], parts) for video_id in ids if video_id in api.videos]
+        return 200, {}, {'kind': 'youtube#videoListResponse', 'items': items,
+                         'pageInfo': {'totalResults': len(items), 'resultsPerPage': len(items)}}
+    if name == 'channels.list':
+        return 200, {}, {'kind': 'youtube#channelListResponse', 'items': [{
+            'kind': 'youtube#channel', 'id': 'UCfakechannel0000000000',
+            'snippet': {'title': 'Fake channel'},
+            'statistics': {'videoCount': str(len(api.videos))},
+        }]}
+    item = json.loads(body or b'{}')
+    video_id = item.get('snippet', {}).get('resourceId', {}).get('videoId')
+    if video_id not in api.videos:
+        return 404, {}, _error_body(404, 'videoNotFound', f"Video not found: {video_id}")
+    item.update(kind='youtube#playlistItem', id=uuid.uuid4().hex)
+    with api._lock:
+        api.playlist_items.append(item)
+    return 200, {}, item
+
+def _parse_http_request(payload):
+    """Split an application/http batch part into (method, path, query, body)"""
+    payload = payload.replace(b'\r\n', b'\n')
+    head, _, body = payload.partition(b'\n\n')
+    request_line = head.split(b'\n', 1)[0].decode()
+    method, target, _ = request_line.split(' ', 2)
+    url = urlsplit(target)
+    return method, url.path, parse_qs(url.query), body
+
+def serve_api(**options):
+    """
+    Start the fake API server in a background thread
+    options: see DEFAULT_OPTIONS (can be changed later with api.reset(...))
+    Returns (server, api, base_url); call server.shutdown() when done.
+    """
+    api = FakeYouTube(**options)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _read_body(self, throttled=False):
+            remaining = int(self.headers.get('Content-Length') or 0)
+            chunks = []
+            while remaining:
+                block = self.rfile.read(min(READ_BLOCK, remaining))
+                if not block:
+                    break
+                if throttled:
+                    api.throttle(len(block))
+                chunks.append(block)
+                remaining -= len(block)
+            return b''.join(chunks)
+
+        def _send(self, status, body=None, headers=None):
+            if api.options['latency']:
+                time.sleep(api.options['latency'])
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body).encode()
+            body = body or b''
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            if body and 'Content-Type' not in (headers or {}):
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/_admin/stats':
+                self._send(200, api.snapshot())
+            else:
+                self._send_api('GET', url)
+
+        def _send_api(self, method, url, body=None):
+            status, headers, data = _handle_api(api, method, url.path, parse_qs(url.query), body)
+            self._send(status, data, headers)
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            if url.path == '/_admin/reset':
+                api.reset(**json.loads(self._read_body() or b'{}'))
+                self._send(200, {})
+            elif url.path == '/upload/youtube/v3/videos' and query.get('uploadType') == ['resumable']:
+                self._start_upload(url, query)
+            elif url.path == '/batch':
+                self._batch()
+            else:
+                self._send_api('POST', url, self._read_body())
+
+        def _start_upload(self, url, query):
+            metadata = json.loads(self._read_body() or b'{}')
+            api.count_request('videos.insert')
+            if api.inject_error():
+                status = api.options['error_status']
+                self._send(status, _error_body(status, 'backendError', 'Injected error'))
+                return
+            if not api.charge('videos.insert'):
+                self._send(403, _error_body(403, 'quotaExceeded', 'The request cannot be completed because you have exceeded your quota.'))
+                return
+            total = self.headers.get('X-Upload-Content-Length')
+            upload_id = api.create_session(metadata, int(total) if total else None)
+            host = self.headers.get('Host')
+            self._send(200, headers={'Location': f'http://{host}/upload/youtube/v3/videos?uploadType=resumable'
+                                                 f'&upload_id={upload_id}'})
+
+        def do_PUT(self):
+            url = urlsplit(self.path)
+            upload_id = parse_qs(url.query).get('upload_id', [None])[0]
+            session = api.sessions.get(upload_id)
+            content_range = self.headers.get('Content-Range', '')
+            if session is None:
+                self._read_body()
+                self._send(404, _error_body(404, 'notFound', 'Upload session not found'))
+                return
+            match = re.match(r'bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)', content_range)
+            if match is None:
+                self._read_body()
+                self._send(400, _error_body(400, 'badContent', f"Bad Content-Range: {content_range}"))
+                return
+            if match.group(3) != '*':
+                session['total'] = int(match.group(3))
+
+            if match.group(1) is None:
+                # Status query after an error: report what was received
+                api.count('status_queries')
+                self._read_body()
+            else:
+                api.count('upload_chunks')
+                body = self._read_body(throttled=True)
+                api.count('bytes_received', len(body))
+                if api.inject_error():
+                    status = api.options['error_status']
+                    self._send(status, _error_body(status, 'backendError', 'Injected error'))
+                    return
+                start = int(match.group(1))
+                if start <= session['received'] < start + len(body):
+                    session['received'] = start + len(body)
+
+            if session['total'] is not None and session['received'] >= session['total']:
+                self._send(200, api.finish_upload(upload_id))
+                return
+            headers = {'Range': f"bytes=0-{session['received'] - 1}"} if session['received'] else {}
+            self._send(308, headers=headers)
+
+        def _batch(self):
+            api.count('batch_requests')
+            content_type = self.headers.get('Content-Type')
+            message = BytesParser().parsebytes(f'Content-Type: {content_type}\r\n\r\n'.encode() + self._read_body())
+            boundary = uuid.uuid4().hex
+            parts = []
+            for part in message.get_payload():
+                method, path, query, body = _parse_http_request(part.get_payload(decode=True))
+                status, _, data = _handle_api(api, method, path, query, body)
+                response = json.dumps(data)
+                parts.append(
+                    f"--{boundary}\r\nContent-Type: application/http\r\n"
+                    f"Content-ID: <response-{part['Content-ID'][1:-1]}>\r\n\r\n"
+                    f"HTTP/1.1 {status} {self.responses.get(status, ('',))[0]}\r\n"
+                    f"Content-Type: application/json; charset=UTF-8\r\nContent-Length: {len(response.encode())}\r\n\r\n"
+                    f"{response}\r\n"
+                )
+            body = (''.join(parts) + f"--{boundary}--\r\n").encode()
+            self._send(200, body, {'Content-Type': f'multipart/mixed; boundary={boundary}'})
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, api, f'http://127.0.0.1:{server.server_address[1]}'
+
+def build_service(base_url):
+    """YouTube service from the bundled discovery document, sending every request to base_url"""
+    document = dict(discovery_document())
+    document['rootUrl'] = document['baseUrl'] = document['mtlsRootUrl'] = base_url.rstrip('/') + '/'
+    return googleapiclient.discovery.build_from_document(document, http=googleapiclient.http.build_http())
@@ -0,0 +1,181 @@
+"""
+Local stand-in for YouTube used by the download benchmarks.
+
+serve_fixtures() starts an HTTP server with fixture channels (paged JSON
+listings), per-video metadata and media files. LocalChannelIE and LocalVideoIE
+are yt-dlp extractors that resolve youtube.com channel and watch URLs against
+that server, so main/download.py runs unchanged on top of them.
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+import yt_dlp
+from yt_dlp.extractor.common import InfoExtractor
+
+MAIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'main')
+if MAIN_DIR not in sys.path:
+    sys.path.insert(0, MAIN_DIR)
+
+# Entries per listing page (YouTube's browse API returns about 30 per continuation)
+PAGE_SIZE = 30
+
+def make_fixtures(folder, duration=15, size_mb=4):
+    """
+    Create the media fixtures served for every video
+    With ffmpeg a real clip is encoded (separate mp4 video and m4a audio plus a
+    combined mp4, like YouTube's DASH formats); without it a combined file of
+    size_mb random bytes is written.
+    Returns {'video': ..., 'audio': ..., 'combined': ...} (missing formats are None)
+    """
+    os.makedirs(folder, exist_ok=True)
+    fixtures = {'video': None, 'audio': None, 'combined': 'combined.mp4'}
+    combined = os.path.join(folder, 'combined.mp4')
+
+    if shutil.which('ffmpeg'):
+        if not os.path.exists(combined):
+            subprocess.run(
+                ['ffmpeg', '-v', 'error', '-y',
+                 '-f', 'lavfi', '-i', f'testsrc=size=1080x1920:rate=30:duration={duration}',
+                 '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+                 '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', '-c:a', 'aac',
+                 '-shortest', combined],
+                check=True
+            )
+            subprocess.run(['ffmpeg', '-v', 'error', '-y', '-i', combined, '-an', '-c', 'copy',
+                            os.path.join(folder, 'video.mp4')], check=True)
+            subprocess.run(['ffmpeg', '-v', 'error', '-y', '-i', combined, '-vn', '-c', 'copy',
+                            os.path.join(folder, 'audio.m4a')], check=True)
+        fixtures['video'] = 'video.mp4'
+        fixtures['audio'] = 'audio.m4a'
+    elif not os.path.exists(combined):
+        with open(combined, 'wb') as f:
+            f.write(os.urandom(size_mb * 1024 * 1024))
+    return fixtures
+
+def channel_videos(channel, count):
+    """Deterministic fixture videos of a channel, newest first"""
+    return [
+        {
+            'id': f'{channel}-{i:05d}',
+            'title': f'Benchmark short {i} from {channel}',
+            'duration': 15,
+            'view_count': (i * 7919) % 100000,
+            'upload_date': time.strftime('%Y%m%d', time.gmtime(time.time() - i * 3600)),
+        }
+        for i in range(count)
+    ]
+
+def serve_fixtures(fixtures_dir, fixtures, videos_per_channel=100, latency=0.0):
+    """
+    Start the fixture server in a background thread
+    latency: Seconds added to every API (listing/metadata) response
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    class Handler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=fixtures_dir, **kwargs)
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, data):
+            if latency:
+                time.sleep(latency)
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            page = re.match(r'^/api/channel/([\w-]+)/page/(\d+)$', self.path)
+            video = re.match(r'^/api/video/([\w-]+)$', self.path)
+            if page:
+                videos = channel_videos(page.group(1), videos_per_channel)
+                start = int(page.group(2)) * PAGE_SIZE
+                self._send_json({'entries': videos[start:start + PAGE_SIZE],
+                                 'has_more': start + PAGE_SIZE < len(videos)})
+            elif video:
+                channel, _, index = video.group(1).rpartition('-')
+                self._send_json({'id': video.group(1), 'fixtures': fixtures,
+                                 **channel_videos(channel, int(index) + 1)[int(index)]})
+            elif self.path.startswith('/media/'):
+                self.path = self.path[len('/media'):]
+                super().do_GET()
+            else:
+                self.send_error(404)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    LocalChannelIE.server_url = LocalVideoIE.server_url = base_url
+    return server, base_url
+
+class LocalChannelIE(InfoExtractor):
+    """Lists https://www.youtube.com/@<channel>/shorts from the fixture server, one page at a time"""
+    IE_NAME = 'LocalChannel'
+    _VALID_URL = r'https?://(?:www\.)?youtube\.com/@(?P<id>[\w-]+)/shorts'
+    server_url = None
+
+    def _entries(self, channel):
+        page = 0
+        while True:
+            data = self._download_json(f'{self.server_url}/api/channel/{channel}/page/{page}', channel,
+                                       note=f'Downloading page {page + 1}')
+            for video in data['entries']:
+                yield self.url_result(
+                    f"https://www.youtube.com/watch?v={video['id']}", LocalVideoIE, video['id'], video['title'],
+                    duration=video['duration'], view_count=video['view_count'])
+            if not data['has_more']:
+                return
+            page += 1
+
+    def _real_extract(self, url):
+        channel = self._match_id(url)
+        return self.playlist_result(self._entries(channel), channel, channel)
+
+class LocalVideoIE(InfoExtractor):
+    """Resolves https://www.youtube.com/watch?v=<id> against the fixture server"""
+    IE_NAME = 'LocalVideo'
+    _VALID_URL = r'https?://(?:www\.)?youtube\.com/watch\?v=(?P<id>[\w-]+)'
+    server_url = None
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        data = self._download_json(f'{self.server_url}/api/video/{video_id}', video_id)
+        fixtures = data['fixtures']
+        formats = [{
+            'format_id': '18', 'url': f"{self.server_url}/media/{fixtures['combined']}", 'ext': 'mp4',
+            'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2', 'height': 1920, 'width': 1080, 'quality': 1,
+        }]
+        if fixtures['video'] and fixtures['audio']:
+            formats += [{
+                'format_id': '137', 'url': f"{self.server_url}/media/{fixtures['video']}", 'ext': 'mp4',
+                'vcodec': 'avc1.640028', 'acodec': 'none', 'height': 1920, 'width': 1080, 'quality': 2,
+            }, {
+                'format_id': '140', 'url': f"{self.server_url}/media/{fixtures['audio']}", 'ext': 'm4a',
+                'vcodec': 'none', 'acodec': 'mp4a.40.2', 'quality': 2,
+            }]
+        return {
+            'id': video_id,
+            'title': data['title'],
+            'duration': data['duration'],
+            'view_count': data['view_count'],
+            'upload_date': data['upload_date'],
+            'formats': formats,
+        }
+
+def make_local_ydl(opts):
+    """YoutubeDL that only knows the local extractors (drop-in for download._make_ydl)"""
+    ydl = yt_dlp.YoutubeDL(opts, auto_init=False)
+    ydl.add_info_extractor(LocalChannelIE())
+    ydl.add_info_extractor(LocalVideoIE())
+    return ydl
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, timezone
+
+# Default location of the download archive (shared by every output folder)
+ARCHIVE_FILE = 'download_archive.db'
+
+def file_sha256(path, block_size=1024*1024):
+    """Compute the SHA-256 of a file without loading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class DownloadArchive:
+    """
+    Persistent record of downloaded videos keyed by YouTube video id.
+    Lookups hit the primary key index, so checking an id costs the same
+    whatever the title, folder or current file name of the video is.
+    """
+
+    def __init__(self, db_path=ARCHIVE_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS downloads (
+                    video_id TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    size INTEGER,
+                    sha256 TEXT,
+                    downloaded_at TEXT NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_downloads_sha256 ON downloads (sha256)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS channel_state (
+                    channel_url TEXT PRIMARY KEY,
+                    listing TEXT NOT NULL,
+                    exhausted INTEGER NOT NULL DEFAULT 0,
+                    upload_watermark TEXT,
+                    listed_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS download_jobs (
+                    video_id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT,
+                    output_folder TEXT NOT NULL,
+                    file_prefix TEXT,
+                    tmp_path TEXT,
+                    downloaded_bytes INTEGER DEFAULT 0,
+                    total_bytes INTEGER,
+                    fragment_index INTEGER,
+                    fragment_count INTEGER,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_download_jobs_folder ON download_jobs (output_folder)")
+
+    def contains(self, video_id):
+        """Check if a video id has already been downloaded"""
+        if not video_id:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM downloads WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, video_id):
+        """Return the archive record of a video id as a dict, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM downloads WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_by_hash(self, sha256):
+        """Return the record of a file with the given content hash, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM downloads WHERE sha256 = ?", (sha256,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record(self, video_id, path):
+        """Record a finished download, storing its path, size and content hash"""
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        sha256 = file_sha256(path)
+        downloaded_at = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads (video_id, path, size, sha256, downloaded_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (video_id, path, size, sha256, downloaded_at)
+            )
+        return {'video_id': video_id, 'path': path, 'size': size, 'sha256': sha256, 'downloaded_at': downloaded_at}
+
+    def update_path(self, video_id, path):
+        """Point an archived video id at a new file location (after a rename or move)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE downloads SET path = ? WHERE video_id = ?", (os.path.abspath(path), video_id)
+            )
+
+    def forget(self, video_id):
+        """Remove a video id so that it can be downloaded again"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM downloads WHERE video_id = ?", (video_id,))
+
+    def get_channel_state(self, channel_url):
+        """
+        Return the crawl state of a channel, or None if it was never crawled
+        The state holds the cached listing (newest first, as rows of
+        [id, title, duration, view_count]), whether that listing reached the end
+        of the channel, the newest upload date seen and when it was listed.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM channel_state WHERE channel_url = ?", (channel_url,)
+            ).fetchone()
+        if not row:
+            return None
+        state = dict(row)
+        state['listing'] = json.loads(state['listing'])
+        state['exhausted'] = bool(state['exhausted'])
+        return state
+
+    def save_channel_state(self, channel_url, listing, exhausted=False, upload_watermark=None, listed_at=None):
+        """Store the crawl state of a channel (the upload watermark only ever moves forward)"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT upload_watermark FROM channel_state WHERE channel_url = ?", (channel_url,)
+            ).fetchone()
+            if row and row['upload_watermark'] and (not upload_watermark or row['upload_watermark'] > upload_watermark):
+                upload_watermark = row['upload_watermark']
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channel_state (channel_url, listing, exhausted, upload_watermark, listed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (channel_url, json.dumps(listing), int(exhausted), upload_watermark,
+                 time.time() if listed_at is None else listed_at)
+            )
+
+    def update_upload_watermark(self, channel_url, upload_date):
+        """Move the upload-date watermark (YYYYMMDD) of a crawled channel forward"""
+        if not upload_date:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE channel_state SET upload_watermark = ? WHERE channel_url = ? "
+                "AND (upload_watermark IS NULL OR upload_watermark < ?)",
+                (upload_date, channel_url, upload_date)
+            )
+
+    def start_job(self, video_id, url, output_folder, title=None):
+        """
+        Register an in-flight download; the row survives a crash so the next run can resume it
+        A job that is already registered keeps its checkpoint and is marked as alive again.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO download_jobs (video_id, url, title, output_folder, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_id) DO UPDATE SET updated_at = excluded.updated_at",
+                (video_id, url, title, os.path.abspath(output_folder), time.time())
+            )
+
+    def claim_job(self, video_id, stale_before):
+        """
+        Take over an interrupted download; False if it was checkpointed since stale_before
+        The check and the claim are one UPDATE, so of two runs recovering the same
+        folder only one resumes the job.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE download_jobs SET updated_at = ? WHERE video_id = ? AND updated_at < ?",
+                (time.time(), video_id, stale_before)
+            )
+        return cursor.rowcount == 1
+
+    def checkpoint_job(self, video_id, file_prefix=None, tmp_path=None, downloaded_bytes=None,
+                       total_bytes=None, fragment_index=None, fragment_count=None):
+        """Store the progress of an in-flight download (temporary file, byte and fragment offsets)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE download_jobs SET file_prefix = COALESCE(?, file_prefix), tmp_path = COALESCE(?, tmp_path), "
+                "downloaded_bytes = COALESCE(?, downloaded_bytes), total_bytes = COALESCE(?, total_bytes), "
+                "fragment_index = COALESCE(?, fragment_index), fragment_count = COALESCE(?, fragment_count), "
+                "updated_at = ? WHERE video_id = ?",
+                (file_prefix, tmp_path, downloaded_bytes, total_bytes, fragment_index, fragment_count,
+                 time.time(), video_id)
+            )
+
+    def finish_job(self, video_id):
+        """Forget an in-flight download once it completed or failed for good"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM download_jobs WHERE video_id = ?", (video_id,))
+
+    def pending_jobs(self, output_folder):
+        """Return the downloads of a folder that were interrupted, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM download_jobs WHERE output_folder = ? ORDER BY updated_at",
+                (os.path.abspath(output_folder),)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,160 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+
+# Job priorities: when jobs wait for the same budget, the highest priority goes first
+PRIORITY_LOW = 0        # batch channel crawls
+PRIORITY_NORMAL = 5     # interactive channel downloads
+PRIORITY_HIGH = 10      # uploads and single videos
+
+# Window (seconds) over which the current transfer rates are measured
+RATE_WINDOW = 5.0
+
+class TokenBucket:
+    """
+    Token bucket limiting the bytes per second of one direction.
+    Transfers are accounted after they happen: the bucket may go into debt
+    and the next transfer waits until the debt is repaid. Waiting transfers
+    are served by priority, then in arrival order. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, rate=0, burst=None):
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._counter = itertools.count()
+        self._history = deque()
+        self._history_bytes = 0
+        self.configure(rate, burst)
+
+    def configure(self, rate, burst=None):
+        """Change the rate limit (bytes/second, 0 for unlimited) and burst size"""
+        with self._cond:
+            self.rate = max(0, int(rate or 0))
+            self.burst = int(burst or max(self.rate, 256 * 1024))
+            self._tokens = self.burst
+            self._last_refill = time.monotonic()
+            self._cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _record(self, nbytes):
+        now = time.monotonic()
+        self._history.append((now, nbytes))
+        self._history_bytes += nbytes
+        while self._history and self._history[0][0] < now - RATE_WINDOW:
+            self._history_bytes -= self._history.popleft()[1]
+
+    def consume(self, nbytes, priority=PRIORITY_NORMAL):
+        """Account for nbytes transferred, blocking while the budget is exhausted"""
+        with self._cond:
+            self._record(nbytes)
+            if not self.rate:
+                return
+            ticket = (-priority, next(self._counter))
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while self.rate:
+                    self._refill()
+                    if self._waiters[0] == ticket and self._tokens > 0:
+                        self._tokens -= nbytes
+                        return
+                    # The head waits exactly for its debt to be repaid, the others for their turn
+                    timeout = (1 - self._tokens) / self.rate if self._waiters[0] == ticket else 0.5
+                    self._cond.wait(max(0.001, timeout))
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+
+    def current_rate(self):
+        """Measured transfer rate over the last RATE_WINDOW seconds (bytes/second)"""
+        with self._cond:
+            self._record(0)
+            return self._history_bytes / RATE_WINDOW
+
+    def waiting(self):
+        """Number of transfers currently waiting for budget"""
+        with self._cond:
+            return len(self._waiters)
+
+class BandwidthGovernor:
+    """
+    Process-wide bandwidth budgets shared by downloads (ingress) and uploads (egress)
+    Limits default to the YT_INGRESS_LIMIT / YT_EGRESS_LIMIT environment
+    variables (bytes per second, unset or 0 for unlimited).
+    """
+
+    def __init__(self, ingress_rate=0, egress_rate=0):
+        self.ingress = TokenBucket(ingress_rate)
+        self.egress = TokenBucket(egress_rate)
+
+    def configure(self, ingress_rate=None, egress_rate=None):
+        """Change the ingress and/or egress limits (bytes/second, 0 for unlimited)"""
+        if ingress_rate is not None:
+            self.ingress.configure(ingress_rate)
+        if egress_rate is not None:
+            self.egress.configure(egress_rate)
+
+    def consume_ingress(self, nbytes, priority=PRIORITY_NORMAL):
+        self.ingress.consume(nbytes, priority)
+
+    def consume_egress(self, nbytes, priority=PRIORITY_HIGH):
+        self.egress.consume(nbytes, priority)
+
+    def rates(self):
+        """Current limits, measured rates (bytes/second) and waiting transfers, for monitoring"""
+        return {
+            name: {
+                'limit': bucket.rate,
+                'current': bucket.current_rate(),
+                'waiting': bucket.waiting(),
+            }
+            for name, bucket in (('ingress', self.ingress), ('egress', self.egress))
+        }
+
+    def ydl_options(self, priority=PRIORITY_NORMAL):
+        """
+        yt-dlp options routing a download through the ingress budget
+        The progress hook accounts every received byte (and blocks the download
+        while over budget); ratelimit keeps a single download under the total.
+        """
+        last_bytes = {}
+        lock = threading.Lock()
+
+        def progress_hook(d):
+            # 'filename' is the final name in both the downloading and finished events
+            key = d.get('filename') or d.get('tmpfilename')
+            downloaded = d.get('downloaded_bytes') or 0
+            with lock:
+                delta = downloaded - last_bytes.get(key, 0)
+                if d.get('status') == 'downloading':
+                    last_bytes[key] = downloaded
+                else:
+                    last_bytes.pop(key, None)
+            if delta > 0:
+                self.consume_ingress(delta, priority)
+
+        options = {'progress_hooks': [progress_hook]}
+        if self.ingress.rate:
+            options['ratelimit'] = self.ingress.rate
+        return options
+
+_governor = None
+_governor_lock = threading.Lock()
+
+def get_governor():
+    """Return the process-wide BandwidthGovernor"""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = BandwidthGovernor(
+                ingress_rate=int(os.environ.get('YT_INGRESS_LIMIT') or 0),
+                egress_rate=int(os.environ.get('YT_EGRESS_LIMIT') or 0)
+            )
+        return _governor
@@ -0,0 +1,125 @@
+import json
+from collections import deque
+
+class CategoryClassifier:
+    """
+    Scores titles against keyword dictionaries in a single pass.
+    All keywords of all categories are compiled into one Aho-Corasick
+    automaton, so a title is scanned once, character by character, and the
+    time per title doesn't grow with the number of keywords (memory grows
+    with their total length). A title's score for a category is the sum of
+    the weights of its keyword occurrences; the best score wins and ties go
+    to the category listed first.
+    keywords: {category: {keyword: weight}} or {category: [keyword, ...]} (weight 1)
+    whole_words: only count keywords that are not part of a longer word
+    (by default keywords match anywhere, like a substring test)
+    """
+
+    def __init__(self, keywords, default=None, whole_words=False):
+        self.categories = list(keywords)
+        self.default = default
+        self.whole_words = whole_words
+        self._index = {category: i for i, category in enumerate(self.categories)}
+        self._build(keywords)
+
+    @classmethod
+    def from_file(cls, path, default=None, whole_words=False):
+        """Load the keyword dictionary from a JSON file (same shape as keywords)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f), default=default, whole_words=whole_words)
+
+    def _build(self, keywords):
+        # Trie of the keywords; outputs[state] lists (category index, weight, keyword length)
+        goto = [{}]
+        outputs = [[]]
+        for category, terms in keywords.items():
+            if not isinstance(terms, dict):
+                terms = dict.fromkeys(terms, 1)
+            category_index = self._index[category]
+            for keyword, weight in terms.items():
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                state = 0
+                for ch in keyword:
+                    next_state = goto[state].get(ch)
+                    if next_state is None:
+                        next_state = goto[state][ch] = len(goto)
+                        goto.append({})
+                        outputs.append([])
+                    state = next_state
+                outputs[state].append((category_index, float(weight), len(keyword)))
+
+        # Failure links, breadth-first; each state also reports the outputs of its failure state
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for ch, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(ch, 0)
+                queue.append(child)
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(out) if out else None for out in outputs]
+        self.states = len(goto)
+
+    def scores(self, title):
+        """Weighted hits per category ({category: score}, matching categories only)"""
+        totals = self._scan(title)
+        return {self.categories[i]: score for i, score in enumerate(totals) if score}
+
+    def _scan(self, title):
+        totals = [0.0] * len(self.categories)
+        text = title.lower()
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        state = 0
+        if self.whole_words:
+            for end, ch in enumerate(text, 1):
+                next_state = goto[state].get(ch)
+                while next_state is None and state:
+                    state = fail[state]
+                    next_state = goto[state].get(ch)
+                state = next_state or 0
+                if outputs[state]:
+                    after = text[end:end + 1]
+                    if after.isalnum():
+                        continue
+                    for category_index, weight, length in outputs[state]:
+                        if end == length or not text[end - length - 1].isalnum():
+                            totals[category_index] += weight
+        else:
+            for ch in text:
+                next_state = goto[state].get(ch)
+                while next_state is None and state:
+                    state = fail[state]
+                    next_state = goto[state].get(ch)
+                state = next_state or 0
+                if outputs[state]:
+                    for category_index, weight, _ in outputs[state]:
+                        totals[category_index] += weight
+        return totals
+
+    def classify(self, title):
+        """Best scoring category of a title (default if no keyword occurs)"""
+        totals = self._scan(title)
+        best = max(totals, default=0)
+        if best <= 0:
+            return self.default
+        return self.categories[totals.index(best)]
+
+    def classify_batch(self, titles):
+        """Categories of many titles, in order; repeated titles are only scanned once"""
+        seen = {}
+        results = []
+        for title in titles:
+            category = seen.get(title)
+            if category is None and title not in seen:
+                category = seen[title] = self.classify(title)
+            results.append(category)
+        return results
@@ -0,0 +1,121 @@
+import os
+import mmap
+import googleapiclient.http
+
+# Resumable upload chunks must be a multiple of this size (except the last one)
+CHUNK_MULTIPLE = 256 * 1024
+
+MIN_CHUNK_SIZE = CHUNK_MULTIPLE
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# The controller sizes chunks so that one takes about this long (seconds) to send
+TARGET_CHUNK_SECONDS = 4.0
+
+# Above this (smoothed) share of failed chunks the chunk size is not grown
+MAX_ERROR_RATE = 0.2
+
+# Weight of the latest sample in the smoothed throughput and error rate
+SMOOTHING = 0.3
+
+def round_chunk_size(size, minimum=MIN_CHUNK_SIZE, maximum=MAX_CHUNK_SIZE):
+    """Round a chunk size down to a multiple of 256 KiB, within [minimum, maximum]"""
+    size = int(size) // CHUNK_MULTIPLE * CHUNK_MULTIPLE
+    return max(minimum, min(maximum, size))
+
+class AdaptiveChunkController:
+    """
+    Picks the chunk size of a resumable upload from measured throughput and errors.
+    After each successful chunk the size moves towards what the link sends in
+    TARGET_CHUNK_SECONDS (at most doubling per chunk); a failed chunk halves it,
+    so less data has to be resent on a flaky link. The size never grows while
+    the smoothed error rate is above MAX_ERROR_RATE.
+    """
+
+    def __init__(self, initial=DEFAULT_CHUNK_SIZE, minimum=MIN_CHUNK_SIZE, maximum=MAX_CHUNK_SIZE,
+                 target_seconds=TARGET_CHUNK_SECONDS):
+        self.minimum = round_chunk_size(minimum, CHUNK_MULTIPLE, maximum)
+        self.maximum = round_chunk_size(maximum, self.minimum, maximum)
+        self.target_seconds = target_seconds
+        self.throughput = None
+        self.error_rate = 0.0
+        self._chunk_size = round_chunk_size(initial, self.minimum, self.maximum)
+
+    def chunksize(self):
+        return self._chunk_size
+
+    def record_success(self, nbytes, seconds):
+        """Feed back a chunk of nbytes confirmed by the server after seconds"""
+        self.error_rate *= 1 - SMOOTHING
+        if nbytes <= 0 or seconds <= 0:
+            return
+        rate = nbytes / seconds
+        self.throughput = rate if self.throughput is None else (1 - SMOOTHING) * self.throughput + SMOOTHING * rate
+        target = self.throughput * self.target_seconds
+        if self.error_rate > MAX_ERROR_RATE:
+            target = min(target, self._chunk_size)
+        target = min(target, self._chunk_size * 2)
+        self._chunk_size = round_chunk_size(target, self.minimum, self.maximum)
+
+    def record_failure(self):
+        """Feed back a failed chunk"""
+        self.error_rate = (1 - SMOOTHING) * self.error_rate + SMOOTHING
+        self._chunk_size = round_chunk_size(self._chunk_size // 2, self.minimum, self.maximum)
+
+class MmapMediaUpload(googleapiclient.http.MediaUpload):
+    """
+    Resumable media upload reading straight from a memory-mapped file.
+    getbytes returns memoryview slices of the mapping, so chunks are sent
+    without being copied into Python buffers first. The chunk size can be
+    changed between chunks (see AdaptiveChunkController).
+    """
+
+    def __init__(self, filename, mimetype='application/octet-stream', chunksize=DEFAULT_CHUNK_SIZE, resumable=True):
+        self._filename = filename
+        self._mimetype = mimetype
+        self._resumable = resumable
+        self.set_chunksize(chunksize)
+        self._fd = open(filename, 'rb')
+        self._size = os.fstat(self._fd.fileno()).st_size
+        # Empty files can't be mapped
+        self._mmap = mmap.mmap(self._fd.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+        self._view = memoryview(self._mmap) if self._mmap is not None else memoryview(b'')
+
+    def set_chunksize(self, chunksize):
+        if chunksize % CHUNK_MULTIPLE:
+            raise ValueError(f"Chunk size must be a multiple of {CHUNK_MULTIPLE} bytes")
+        self._chunksize = chunksize
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._size
+
+    def resumable(self):
+        return self._resumable
+
+    def getbytes(self, begin, length):
+        return self._view[begin:begin + length]
+
+    def has_stream(self):
+        return False
+
+    def close(self):
+        try:
+            self._view.release()
+            if self._mmap is not None:
+                self._mmap.close()
+        except BufferError:
+            # A chunk slice is still referenced; the mapping is freed with it
+            pass
+        self._fd.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,280 @@
+import os
+import json
+import shutil
+import itertools
+import sqlite3
+import threading
+import subprocess
+from datetime import datetime, timezone
+
+# Default location of the perceptual fingerprint index
+FINGERPRINT_FILE = 'fingerprints.db'
+
+# Positions (fraction of the duration) of the frames sampled from each video
+SAMPLE_POSITIONS = (0.1, 0.3, 0.5, 0.7, 0.9)
+
+# Two frames match when their 64-bit hashes differ in at most this many bits
+DEFAULT_MAX_DISTANCE = 10
+
+# A video is a near-duplicate when this many of its sampled frames match the same stored video
+DEFAULT_MIN_MATCHING_FRAMES = 3
+
+def ffmpeg_available():
+    """Check if ffmpeg and ffprobe are on the PATH"""
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+def probe_duration(path):
+    """Get the duration of a media file in seconds with ffprobe (None if unknown)"""
+    try:
+        output = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', path],
+            capture_output=True, text=True, timeout=30
+        ).stdout.strip()
+        return float(output)
+    except (ValueError, OSError, subprocess.SubprocessError):
+        return None
+
+def _frame_dhash(path, position):
+    """
+    Difference hash of the frame at position (seconds)
+    ffmpeg scales the frame to 9x8 grayscale; each bit says whether a pixel
+    is brighter than its right neighbour, which survives re-encoding and resizing.
+    """
+    pixels = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-ss', f'{position:.3f}', '-i', path, '-frames:v', '1',
+         '-vf', 'scale=9:8,format=gray', '-f', 'rawvideo', 'pipe:1'],
+        capture_output=True, timeout=30
+    ).stdout
+    if len(pixels) < 72:
+        return None
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+def video_fingerprint(path, positions=SAMPLE_POSITIONS):
+    """Compute the perceptual hashes of a few frames sampled across the video (None if it can't be read)"""
+    duration = probe_duration(path)
+    if not duration:
+        return None
+    hashes = []
+    for fraction in positions:
+        try:
+            frame_hash = _frame_dhash(path, duration * fraction)
+        except (OSError, subprocess.SubprocessError):
+            frame_hash = None
+        if frame_hash is not None:
+            hashes.append(frame_hash)
+    return hashes or None
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+class MultiIndexHashTable:
+    """
+    Multi-index hashing over 64-bit hashes for fast Hamming-distance range queries.
+    Hashes are split into a few wide substrings (4 x 16 bits). By the pigeonhole
+    principle two hashes within max_distance differ in at most
+    max_distance // substrings bits of at least one substring, so a query looks
+    up every value within that radius of each of its substrings and only
+    compares against the hashes found there. Wide substrings keep the buckets
+    small: with max_distance=10 a query probes 4 x 137 buckets and visits well
+    under 1% of a large index.
+    """
+
+    def __init__(self, max_distance=DEFAULT_MAX_DISTANCE, bits=64, substring_bits=16):
+        self.max_distance = max_distance
+        parts = max(1, bits // substring_bits)
+        self._ranges = [
+            (i * bits // parts, (1 << ((i + 1) * bits // parts - i * bits // parts)) - 1)
+            for i in range(parts)
+        ]
+        self.radius = max_distance // parts
+        # XOR masks of every value within radius bits of a substring, per substring width
+        self._probes = {}
+        for _, mask in self._ranges:
+            width = mask.bit_length()
+            if width not in self._probes:
+                self._probes[width] = [
+                    sum(1 << bit for bit in flipped)
+                    for r in range(self.radius + 1)
+                    for flipped in itertools.combinations(range(width), r)
+                ]
+        self._tables = [{} for _ in self._ranges]
+        self._hashes = []
+        self._values = []
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, value_hash, value):
+        slot = len(self._hashes)
+        self._hashes.append(value_hash)
+        self._values.append(value)
+        for table, (shift, mask) in zip(self._tables, self._ranges):
+            table.setdefault((value_hash >> shift) & mask, []).append(slot)
+
+    def search(self, value_hash, max_distance=None):
+        """Return (distance, value) pairs for every stored hash within max_distance"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        hashes = self._hashes
+        candidates = set()
+        for table, (shift, mask) in zip(self._tables, self._ranges):
+            substring = (value_hash >> shift) & mask
+            for probe in self._probes[mask.bit_length()]:
+                slots = table.get(substring ^ probe)
+                if slots:
+                    candidates.update(slots)
+        matches = []
+        for slot in candidates:
+            distance = (hashes[slot] ^ value_hash).bit_count()
+            if distance <= max_distance:
+                matches.append((distance, self._values[slot]))
+        return matches
+
+class NearDuplicateIndex:
+    """
+    Persistent index of video fingerprints.
+    Fingerprints are stored in SQLite and loaded into a multi-index hash table,
+    so lookups only visit a small part of the index even with hundreds of thousands of frames.
+    """
+
+    def __init__(self, db_path=FINGERPRINT_FILE, max_distance=DEFAULT_MAX_DISTANCE,
+                 min_matching_frames=DEFAULT_MIN_MATCHING_FRAMES):
+        self.db_path = db_path
+        self.max_distance = max_distance
+        self.min_matching_frames = min_matching_frames
+        self.enabled = ffmpeg_available()
+        # Reentrant, so check() can hold it across find_duplicate() and add()
+        self._lock = threading.RLock()
+        self._table = MultiIndexHashTable(max_distance)
+        self._paths = {}
+        self._path_keys = {}
+        self._added = {}
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    video_key TEXT PRIMARY KEY,
+                    path TEXT,
+                    hashes TEXT NOT NULL,
+                    added_at TEXT NOT NULL
+                )
+            """)
+            for video_key, path, hashes, added_at in self._conn.execute(
+                    "SELECT video_key, path, hashes, added_at FROM fingerprints"):
+                self._index(video_key, path, json.loads(hashes), added_at)
+        if not self.enabled:
+            print("⚠ ffmpeg/ffprobe not found, near-duplicate detection is disabled")
+
+    def _index(self, video_key, path, hashes, added_at):
+        for frame_hash in hashes:
+            self._table.add(frame_hash, video_key)
+        self._added[video_key] = added_at
+        self._set_path(video_key, path)
+
+    def _set_path(self, video_key, path):
+        old_path = self._paths.get(video_key)
+        if old_path:
+            self._path_keys.pop(old_path, None)
+        path = os.path.abspath(path) if path else None
+        self._paths[video_key] = path
+        if path:
+            self._path_keys[path] = video_key
+
+    def __len__(self):
+        return len(self._paths)
+
+    def has_path(self, path):
+        """Check if a fingerprint is stored for this file"""
+        path = os.path.abspath(path)
+        with self._lock:
+            return path in self._path_keys
+
+    def find_duplicate(self, hashes, exclude_path=None, indexed_before=None):
+        """
+        Return the key of a stored video matching the given fingerprint, or None
+        exclude_path: Ignore the stored entry of this file (so a file never matches itself)
+        indexed_before: Optional (added_at, video_key); only videos indexed before it are considered
+        """
+        exclude_path = os.path.abspath(exclude_path) if exclude_path else None
+        matching_frames = {}
+        with self._lock:
+            for frame_hash in hashes:
+                for video_key in {key for _, key in self._table.search(frame_hash, self.max_distance)}:
+                    if exclude_path and self._paths.get(video_key) == exclude_path:
+                        continue
+                    if indexed_before and (self._added[video_key], video_key) >= indexed_before:
+                        continue
+                    matching_frames[video_key] = matching_frames.get(video_key, 0) + 1
+        required = min(self.min_matching_frames, len(hashes))
+        candidates = [(count, key) for key, count in matching_frames.items() if count >= required]
+        return max(candidates)[1] if candidates else None
+
+    def add(self, video_key, path, hashes):
+        """Store the fingerprint of a video"""
+        with self._lock, self._conn:
+            if video_key in self._paths:
+                self._conn.execute(
+                    "UPDATE fingerprints SET path = ? WHERE video_key = ?", (os.path.abspath(path), video_key)
+                )
+                self._set_path(video_key, path)
+                return
+            added_at = datetime.now(timezone.utc).isoformat()
+            self._conn.execute(
+                "INSERT INTO fingerprints (video_key, path, hashes, added_at) VALUES (?, ?, ?, ?)",
+                (video_key, os.path.abspath(path), json.dumps(hashes), added_at)
+            )
+            self._index(video_key, path, hashes, added_at)
+
+    def update_path(self, video_key, path):
+        """Point a stored fingerprint at a new file location"""
+        with self._lock, self._conn:
+            if video_key not in self._paths:
+                return
+            self._conn.execute(
+                "UPDATE fingerprints SET path = ? WHERE video_key = ?", (os.path.abspath(path), video_key)
+            )
+            self._set_path(video_key, path)
+
+    def check(self, path, video_key=None):
+        """
+        Fingerprint a video file and look for a near-duplicate
+        Returns (duplicate_key, hashes); duplicate_key is None for new videos.
+        The file is added to the index under video_key (or its path) when it is
+        new and not indexed yet.
+        An indexed file isn't fingerprinted again: its stored fingerprint is only
+        compared with the videos indexed before it (earliest added_at first, ties
+        by key), so of two copies indexed by different runs exactly one is kept.
+        """
+        if not self.enabled:
+            return None, None
+        with self._lock:
+            own_key = self._path_keys.get(os.path.abspath(path))
+            if own_key is not None:
+                row = self._conn.execute("SELECT hashes FROM fingerprints WHERE video_key = ?", (own_key,)).fetchone()
+                hashes = json.loads(row[0])
+                return self.find_duplicate(hashes, path, (self._added[own_key], own_key)), hashes
+        hashes = video_fingerprint(path)
+        if not hashes:
+            return None, None
+        # One lock scope, so two workers can't both admit the same clip
+        with self._lock:
+            duplicate_key = self.find_duplicate(hashes, exclude_path=path)
+            if duplicate_key is None and not self.has_path(path):
+                self.add(video_key or os.path.abspath(path), path, hashes)
+        return duplicate_key, hashes
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
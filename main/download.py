@@ -1,36 +1,428 @@
 import os
 import yt_dlp
 import re
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from archive import DownloadArchive, ARCHIVE_FILE
+from dedupe import NearDuplicateIndex, FINGERPRINT_FILE
+from transcode import apply_transcode_policy
+from bandwidth import get_governor, PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH
+from spool import Spool
+from retry import call_with_retry, classify_error
+from sidecar import build_sidecar, write_sidecar
+from hashtag_generator import generate_basic_metadata
+
+# Number of concurrent download workers used by download_shorts
+DEFAULT_MAX_WORKERS = 4
+
+# How many flat entries are scanned to pick the most viewed shorts
+DEFAULT_VIEWS_SCAN_LIMIT = 500
+
+# Seconds a cached channel listing is reused without asking YouTube again
+DEFAULT_LISTING_TTL = 30 * 60
+
+# Maximum number of entries kept in a channel's cached listing
+MAX_CACHED_LISTING = 2000
+
+# Longer videos are not typical shorts and are skipped
+MAX_SHORT_DURATION = 60
+
+# Seconds between two progress checkpoints of the same download
+CHECKPOINT_INTERVAL = 1.0
+
+# Jobs without a checkpoint for this long (seconds) belong to a dead run and are resumed
+STALE_JOB_AGE = 5 * 60
+
+# Partial files no job refers to are removed once they are this old (seconds)
+ORPHAN_AGE = 15 * 60
+
+# Space reserved in the spool before each download starts (a 1080p short is usually well below this)
+ESTIMATED_DOWNLOAD_BYTES = 64 * 1024 * 1024
+
+# Attempts per video download (transient errors only; yt-dlp retries fragments on its own)
+DOWNLOAD_MAX_ATTEMPTS = 3
 
 def sanitize_filename(filename):
     """Remove invalid characters from filename"""
     return re.sub(r'[<>:"/\\|?*]', '', filename)
 
+class ShortEntry:
+    """Compact record for one flat-listed channel entry"""
+    __slots__ = ('id', 'title', 'duration', 'view_count')
+
+    def __init__(self, id, title=None, duration=None, view_count=None):
+        self.id = id
+        self.title = title or 'Unknown Title'
+        self.duration = duration
+        self.view_count = view_count
+
+    @classmethod
+    def from_info(cls, info):
+        """Build an entry from a flat yt-dlp info dict"""
+        return cls(info.get('id'), info.get('title'), info.get('duration'), info.get('view_count'))
+
+    @classmethod
+    def from_row(cls, row):
+        """Build an entry from a cached listing row"""
+        return cls(*row)
+
+    def to_row(self):
+        """Compact row stored in the cached channel listing"""
+        return [self.id, self.title, self.duration, self.view_count]
+
+    @property
+    def url(self):
+        return f"https://www.youtube.com/watch?v={self.id}"
+
+    def __repr__(self):
+        return f"ShortEntry({self.id!r}, {self.title!r})"
+
+def iter_channel_entries(channel_url, stop_ids=None, upload_watermark=None):
+    """
+    Lazily list the entries of a channel tab without resolving each video
+    Pages are only fetched as the generator is consumed, so stopping early
+    stops the network work too.
+    stop_ids: Optional set of known ids; listing stops at the first one
+    upload_watermark: Optional YYYYMMDD date; listing stops at older entries
+    """
+    listing_opts = {
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+        'quiet': True,
+        'no_warnings': True,
+        'ignoreerrors': True,
+    }
+    with _make_ydl(listing_opts) as ydl:
+        playlist_info = ydl.extract_info(channel_url, download=False, process=False)
+        if not playlist_info:
+            return
+        for info in playlist_info.get('entries') or ():
+            if not info or not info.get('id'):
+                continue
+            # Channel tabs are listed newest first, so a known id means the rest is known too
+            if stop_ids and info['id'] in stop_ids:
+                return
+            if upload_watermark and info.get('upload_date') and info['upload_date'] < upload_watermark:
+                return
+            yield ShortEntry.from_info(info)
+
+def select_entries(entries, sort_by="views", limit=5, scan_limit=DEFAULT_VIEWS_SCAN_LIMIT):
+    """
+    Pick up to limit entries from an entry iterator without materialising it
+    'date' takes the first entries (channel tabs are listed newest first),
+    'views' keeps the most viewed entries among the first scan_limit ones.
+    """
+    if sort_by == 'views':
+        scanned = itertools.islice(entries, max(limit, scan_limit or 0))
+        return heapq.nlargest(limit, scanned, key=lambda entry: entry.view_count or 0)
+    return list(itertools.islice(entries, limit))
+
+def list_channel(channel_url, sort_by="views", limit=5, archive=None, listing_ttl=DEFAULT_LISTING_TTL):
+    """
+    List the entries to download from a channel, reusing its crawl state
+    A listing younger than listing_ttl is reused as is when it has enough
+    entries for limit (or is the whole channel). Otherwise only the new entries
+    are fetched: paging stops at the first already-listed id or at the
+    upload-date watermark, and the delta is merged into the cached listing.
+    A listing too short for limit, or no archive, means listing from scratch.
+    """
+    needed = limit if sort_by != 'views' else max(limit, DEFAULT_VIEWS_SCAN_LIMIT)
+    state = archive.get_channel_state(channel_url) if archive else None
+    cached = [ShortEntry.from_row(row) for row in state['listing']] if state else []
+
+    # A cached listing is only enough (as is, or plus the delta) when it covers what we need
+    covered = bool(state) and (len(cached) >= needed or state['exhausted'])
+    if covered and time.time() - state['listed_at'] < listing_ttl:
+        print(f"Using cached listing ({len(cached)} entries)")
+        return select_entries(iter(cached), sort_by, limit), 0
+
+    incremental = bool(cached) and covered
+    if incremental:
+        listing = iter_channel_entries(channel_url, {entry.id for entry in cached}, state['upload_watermark'])
+        bound = MAX_CACHED_LISTING
+    else:
+        listing = iter_channel_entries(channel_url)
+        bound = needed
+    try:
+        new_entries = list(itertools.islice(listing, bound))
+    finally:
+        listing.close()
+
+    if incremental:
+        new_ids = {entry.id for entry in new_entries}
+        merged = new_entries + [entry for entry in cached if entry.id not in new_ids]
+        exhausted = state['exhausted']
+        print(f"Found {len(new_entries)} new entries since the last crawl")
+    else:
+        merged = new_entries
+        exhausted = len(new_entries) < bound
+    merged = merged[:MAX_CACHED_LISTING]
+
+    if archive:
+        archive.save_channel_state(channel_url, [entry.to_row() for entry in merged], exhausted)
+    return select_entries(iter(merged), sort_by, limit), len(new_entries)
+
+def _duration_filter(max_duration=MAX_SHORT_DURATION):
+    """
+    yt-dlp match_filter rejecting videos longer than max_duration seconds
+    Flat-listed entries usually have no duration, so the filter runs on the
+    resolved video, right before its download would start.
+    """
+    def match_filter(info, incomplete=False):
+        duration = info.get('duration')
+        if duration and duration > max_duration:
+            return f"{info.get('title') or info.get('id')} is too long ({duration:.0f}s)"
+        return None
+    return match_filter
+
+def _with_options(ydl_opts, extra):
+    """Merge extra yt-dlp options into ydl_opts, concatenating progress hooks"""
+    extra = dict(extra)
+    hooks = ydl_opts.get('progress_hooks', []) + extra.pop('progress_hooks', [])
+    ydl_opts.update(extra)
+    ydl_opts['progress_hooks'] = hooks
+    return ydl_opts
+
+def _checkpoint_options(archive):
+    """
+    yt-dlp options checkpointing download progress into the archive's job table
+    yt-dlp keeps .part files (and .ytdl fragment state) and continues them,
+    the checkpoints tell the next run which of those files are worth resuming.
+    """
+    last_write = {}
+
+    def progress_hook(d):
+        info = d.get('info_dict') or {}
+        video_id = info.get('id')
+        if not video_id or d.get('status') != 'downloading':
+            return
+        now = time.monotonic()
+        if now - last_write.get(video_id, 0) < CHECKPOINT_INTERVAL:
+            return
+        last_write[video_id] = now
+        final_filename = info.get('_filename') or d.get('filename')
+        archive.checkpoint_job(
+            video_id,
+            file_prefix=os.path.abspath(os.path.splitext(final_filename)[0]) if final_filename else None,
+            tmp_path=os.path.abspath(d['tmpfilename']) if d.get('tmpfilename') else None,
+            downloaded_bytes=d.get('downloaded_bytes'),
+            total_bytes=d.get('total_bytes') or d.get('total_bytes_estimate'),
+            fragment_index=d.get('fragment_index'),
+            fragment_count=d.get('fragment_count')
+        )
+
+    return {'progress_hooks': [progress_hook], 'continuedl': True, 'nopart': False}
+
+def _is_partial_file(filename):
+    """Check if a file name is a temporary file left by yt-dlp or ffmpeg"""
+    return (filename.endswith(('.part', '.ytdl')) or '.part-Frag' in filename
+            or '.temp.' in filename or '.transcode.' in filename)
+
+def recover_download_jobs(output_folder, archive):
+    """
+    Clean up after an interrupted run and return the downloads to resume
+    Partial files of interrupted jobs are kept (yt-dlp continues them),
+    old partial files no job refers to are removed as orphans.
+    Returns ShortEntry records for the jobs that stopped checkpointing; each
+    is claimed in the archive first, so concurrent runs don't resume the same job.
+    """
+    if not os.path.isdir(output_folder):
+        return []
+
+    jobs = archive.pending_jobs(output_folder)
+    prefixes = tuple(job['file_prefix'] + '.' for job in jobs if job['file_prefix'])
+    now = time.time()
+
+    for filename in os.listdir(output_folder):
+        path = os.path.abspath(os.path.join(output_folder, filename))
+        if not _is_partial_file(filename) or (prefixes and path.startswith(prefixes)):
+            continue
+        try:
+            if now - os.path.getmtime(path) >= ORPHAN_AGE:
+                os.remove(path)
+                print(f"Removed orphaned partial file: {filename}")
+        except OSError:
+            pass
+
+    resumable = []
+    for job in jobs:
+        # A recent checkpoint means another run is still downloading it (or has just claimed it)
+        if now - job['updated_at'] < STALE_JOB_AGE or not archive.claim_job(job['video_id'], now - STALE_JOB_AGE):
+            continue
+        title = job['title'] or job['video_id']
+        if job['tmp_path'] and os.path.exists(job['tmp_path']):
+            done = job['downloaded_bytes'] or 0
+            fragments = f", fragment {job['fragment_index']}/{job['fragment_count']}" if job['fragment_count'] else ""
+            print(f"Resuming interrupted download: {title} ({done / (1024*1024):.1f} MB on disk{fragments})")
+        else:
+            print(f"Restarting interrupted download: {title}")
+        resumable.append(ShortEntry(job['video_id'], job['title']))
+    return resumable
+
+def _make_ydl(opts):
+    """Create a YoutubeDL instance for the given options"""
+    return yt_dlp.YoutubeDL(opts)
+
+class DownloadWorkerPool:
+    """
+    Bounded pool of download workers.
+    Every worker thread keeps its own long-lived YoutubeDL instance, so the
+    extractor setup is paid once per worker instead of once per video.
+    Results are collected in the calling thread, which keeps progress
+    callbacks safe for Streamlit (it only allows UI calls from the script thread).
+    """
+
+    def __init__(self, ydl_opts, max_workers=DEFAULT_MAX_WORKERS):
+        self.ydl_opts = ydl_opts
+        self.max_workers = max(1, int(max_workers or 1))
+        self._local = threading.local()
+        self._instances = []
+        self._lock = threading.Lock()
+
+    def _get_ydl(self):
+        """Return the YoutubeDL instance owned by the current worker thread"""
+        ydl = getattr(self._local, 'ydl', None)
+        if ydl is None:
+            ydl = _make_ydl(dict(self.ydl_opts))
+            self._local.ydl = ydl
+            with self._lock:
+                self._instances.append(ydl)
+        return ydl
+
+    def run(self, entries, task, progress_callback=None):
+        """
+        Run task(ydl, index, entry) for every entry and yield the per-entry results
+        entries: list of entries to process
+        task: callable returning a result dict for one entry
+        progress_callback: Optional callback(completed, total, message)
+        """
+        total = len(entries)
+        completed = 0
+        if progress_callback:
+            progress_callback(0, total, f"Starting {total} downloads with {self.max_workers} workers")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="download") as executor:
+            futures = {
+                executor.submit(lambda i=i, e=entry: task(self._get_ydl(), i, e)): (i, entry)
+                for i, entry in enumerate(entries, 1)
+            }
+            for future in as_completed(futures):
+                index, entry = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'index': index, 'status': 'failed', 'error': str(e)}
+                completed += 1
+                if progress_callback:
+                    title = result.get('title') or 'Unknown Title'
+                    progress_callback(completed, total, f"[{result['status']}] {title}")
+                yield result
+
+    def close(self):
+        """Close every YoutubeDL instance created by the workers"""
+        with self._lock:
+            instances, self._instances = self._instances, []
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
 def is_single_video_url(url):
     """Check if the URL is a single video URL"""
     return 'watch?v=' in url or 'youtu.be/' in url
 
-def download_single_video(video_url, output_folder="videos"):
+def extract_video_id(url):
+    """Get the YouTube video id from a watch, youtu.be or shorts URL (None if not found)"""
+    parsed = urlparse(url)
+    if parsed.netloc.endswith('youtu.be'):
+        return parsed.path.strip('/').split('/')[0] or None
+    video_id = parse_qs(parsed.query).get('v', [None])[0]
+    if video_id:
+        return video_id
+    parts = parsed.path.strip('/').split('/')
+    if len(parts) >= 2 and parts[0] in ('shorts', 'embed', 'live'):
+        return parts[1]
+    return None
+
+def _downloaded_path(ydl, info):
+    """Get the final path of a file downloaded (and post-processed) by yt-dlp"""
+    requested = info.get('requested_downloads') or []
+    if requested and requested[-1].get('filepath'):
+        return requested[-1]['filepath']
+    return info.get('filepath') or ydl.prepare_filename(info)
+
+def _sanitize_downloaded_file(path):
+    """Rename a downloaded file so its name has no invalid characters, returning the new path"""
+    folder, filename = os.path.split(path)
+    sanitized_filename = sanitize_filename(filename)
+    if sanitized_filename != filename and os.path.exists(path):
+        new_path = os.path.join(folder, sanitized_filename)
+        os.rename(path, new_path)
+        print(f"Renamed: {filename} -> {sanitized_filename}")
+        return new_path
+    return path
+
+def _write_sidecar(file_path, info):
+    """Save the source metadata and the generated upload metadata next to a downloaded file"""
+    try:
+        write_sidecar(file_path, build_sidecar(info, generate_basic_metadata))
+    except Exception as e:
+        # The uploader falls back to generating metadata from the file name
+        print(f"⚠ Could not write metadata for {os.path.basename(file_path)}: {str(e)}")
+
+def download_single_video(video_url, output_folder="videos", archive=None):
     """
     Download a single YouTube video
     video_url: URL of the YouTube video
     output_folder: Folder to save the downloaded video
+    archive: Optional DownloadArchive (defaults to the shared archive file)
     """
     # Create output folder if it doesn't exist
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
+    spool = Spool(output_folder)
+
+    own_archive = archive is None
+    if own_archive:
+        archive = DownloadArchive(ARCHIVE_FILE)
+
+    # Check the archive before any network work
+    video_id = extract_video_id(video_url)
+    if archive.contains(video_id):
+        record = archive.get(video_id)
+        print(f"✓ Already downloaded: {video_id} ({record['path']})")
+        spool.close()
+        if own_archive:
+            archive.close()
+        return True
 
     # Configure yt-dlp options for single video
     ydl_opts = {
         'format': 'bestvideo[ext=mp4][height<=1080]+bestaudio[ext=m4a]/best[ext=mp4]/best',
-        'outtmpl': os.path.join(output_folder, '%(title).50s.%(ext)s'),
+        'outtmpl': os.path.join(spool.incoming, '%(title).50s.%(ext)s'),
         'quiet': False,
         'no_warnings': False,
         'merge_output_format': 'mp4',
     }
+    _with_options(ydl_opts, get_governor().ydl_options(PRIORITY_HIGH))
+    _with_options(ydl_opts, _checkpoint_options(archive))
 
+    reservation = None
     try:
+        recover_download_jobs(spool.incoming, archive)
+
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             # Get video info first
             video_info = ydl.extract_info(video_url, download=False)
@@ -44,20 +436,31 @@ def download_single_video(video_url, output_folder="videos"):
             proceed = input("Do you want to download this video? (y/n) [default: y]: ").lower() or "y"
             
             if proceed in ['y', 'yes']:
+                reservation = spool.reserve(ESTIMATED_DOWNLOAD_BYTES)
+                if reservation is None:
+                    print("Download cancelled: not enough space in the spool.")
+                    return False
+
                 print(f"Downloading: {video_title}")
-                ydl.download([video_url])
-                
-                # Handle file renaming if needed
-                original_filename = f"{video_title}.mp4"
-                sanitized_filename = sanitize_filename(original_filename)
-                
-                if original_filename != sanitized_filename:
-                    original_path = os.path.join(output_folder, original_filename)
-                    new_path = os.path.join(output_folder, sanitized_filename)
-                    if os.path.exists(original_path):
-                        os.rename(original_path, new_path)
-                        print(f"Renamed: {original_filename} -> {sanitized_filename}")
-                
+                job_id = video_info.get('id') or video_id
+                archive.start_job(job_id, video_url, spool.incoming, video_title)
+                try:
+                    # Reuse the extracted info instead of resolving the video again
+                    info = ydl.process_ie_result(video_info, download=True)
+                except Exception:
+                    archive.finish_job(job_id)
+                    raise
+
+                # Convert only if the streams can't be uploaded as they are, then fix the name
+                file_path = apply_transcode_policy(_downloaded_path(ydl, info))
+                file_path = _sanitize_downloaded_file(file_path)
+                _write_sidecar(file_path, info)
+
+                # Hand the finished file over to the upload queue in one atomic rename
+                file_path = spool.commit(file_path, reservation=reservation)
+                archive.record(job_id, file_path)
+                archive.finish_job(job_id)
+
                 print("Single video download completed successfully!")
                 return True
             else:
@@ -67,19 +470,134 @@ def download_single_video(video_url, output_folder="videos"):
     except Exception as e:
         print(f"Error downloading single video: {str(e)}")
         return False
+    finally:
+        spool.release(reservation)
+        spool.close()
+        if own_archive:
+            archive.close()
 
-def download_shorts(channel_url, output_folder="videos", sort_by="views", limit=5, progress_callback=None):
+def _download_entry(ydl, index, entry, spool, total, archive, dedupe_index=None):
     """
-    Download shorts from a YouTube channel
-    channel_url: URL of the YouTube channel
-    output_folder: Folder to save the downloaded videos
-    sort_by: How to sort videos ('views' or 'date')
-    limit: Maximum number of videos to download
-    progress_callback: Optional callback function for progress updates
+    Download one ShortEntry with the worker's YoutubeDL instance (full resolution happens here)
+    Returns a result dict with the entry id, title, status and error (if any)
+    """
+    video_title = entry.title
+    result = {'index': index, 'id': entry.id, 'title': video_title, 'status': 'failed', 'error': None}
+    reservation = None
+
+    try:
+        video_url = entry.url
+
+        print(f"\n[{index}/{total}] Processing: {video_title}")
+        if entry.duration:
+            print(f"Duration: {entry.duration} seconds")
+
+        # Skip long videos without resolving them when the listing knows the duration
+        # (flat listings usually don't; the worker's match_filter catches those)
+        if entry.duration and entry.duration > MAX_SHORT_DURATION:
+            print(f"Skipping (too long): {video_title}")
+            result['status'] = 'skipped'
+            result['error'] = 'too long'
+            return result
+
+        # Check the archive by video id (independent of title, folder and file name)
+        if archive.contains(entry.id):
+            print(f"✓ Skipping download, already in archive: {video_title}")
+            result['status'] = 'skipped'
+            result['error'] = 'already downloaded'
+            return result
+
+        # Backpressure: wait until the spool quota has room for another download
+        reservation = spool.reserve(ESTIMATED_DOWNLOAD_BYTES)
+        if reservation is None:
+            result['status'] = 'skipped'
+            result['error'] = 'spool quota reached'
+            return result
+
+        # The job row stays behind if the process dies, so the next run can resume it
+        archive.start_job(entry.id, video_url, spool.incoming, video_title)
+        info = call_with_retry(
+            lambda: ydl.extract_info(video_url, download=True), 'youtube.download', DOWNLOAD_MAX_ATTEMPTS,
+            on_retry=lambda e, error_class, attempt, delay: print(
+                f"⚠ Download error ({error_class.reason}), retry {attempt} in {delay:.1f}s: {video_title}")
+        )
+        if not info:
+            archive.finish_job(entry.id)
+            result['error'] = 'no video information returned'
+            print(f"⚠ Error downloading: {video_title}")
+            return result
+        if (info.get('duration') or 0) > MAX_SHORT_DURATION:
+            # Rejected by the match_filter once resolved, nothing was downloaded
+            archive.finish_job(entry.id)
+            print(f"Skipping (too long): {video_title}")
+            result['status'] = 'skipped'
+            result['error'] = 'too long'
+            return result
+
+        # Convert only if the streams can't be uploaded as they are, then fix the name
+        file_path = apply_transcode_policy(_downloaded_path(ydl, info))
+        file_path = _sanitize_downloaded_file(file_path)
+
+        # Drop re-encoded copies of clips we already have from another channel
+        if dedupe_index is not None:
+            duplicate_key, _ = dedupe_index.check(file_path, entry.id)
+            if duplicate_key:
+                archive.record(entry.id, file_path)
+                archive.finish_job(entry.id)
+                os.remove(file_path)
+                print(f"⚠ Near-duplicate of {duplicate_key}, removed: {video_title}")
+                result['status'] = 'skipped'
+                result['error'] = f'near-duplicate of {duplicate_key}'
+                return result
+
+        # Metadata is generated here, overlapping with the other workers' downloads
+        _write_sidecar(file_path, info)
+
+        # Hand the finished file over to the upload queue in one atomic rename
+        file_path = spool.commit(file_path, reservation=reservation)
+        archive.record(entry.id, file_path)
+        archive.finish_job(entry.id)
+        if dedupe_index is not None:
+            dedupe_index.update_path(entry.id, file_path)
+
+        result['status'] = 'downloaded'
+        result['path'] = file_path
+        result['upload_date'] = info.get('upload_date')
+        print(f"✓ Downloaded successfully: {video_title}")
+
+    except Exception as e:
+        archive.finish_job(entry.id)
+        error_class = classify_error(e)
+        result['error'] = str(e)
+        if error_class.transient:
+            print(f"⚠ Error downloading after {DOWNLOAD_MAX_ATTEMPTS} attempts ({error_class.reason}): {str(e)}")
+        else:
+            # Private, removed, age-restricted... the site's answer won't change on a retry
+            print(f"⚠ Skipping {video_title} ({error_class.reason}): {str(e)}")
+    finally:
+        # Skipped and failed downloads give their space back (a committed one already did)
+        spool.release(reservation)
+
+    return result
+
+def crawl_channel(channel_url, output_folder="videos", sort_by="views", limit=5, progress_callback=None,
+                  max_workers=DEFAULT_MAX_WORKERS, archive=None, listing_ttl=DEFAULT_LISTING_TTL,
+                  skip_duplicates=True, dedupe_index=None, priority=PRIORITY_NORMAL):
+    """
+    Download shorts from a YouTube channel and return a summary dict
+    The summary holds the channel URL, the downloaded/skipped/failed counts,
+    the per-entry results and the setup error (if any).
+    Arguments are the same as download_shorts, plus the bandwidth priority of the downloads.
     """
+    summary = {
+        'channel_url': channel_url, 'listed': 0, 'new_entries': 0,
+        'downloaded': 0, 'skipped': 0, 'failed': 0, 'results': [], 'error': None,
+    }
+
     # Create output folder if it doesn't exist
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
+    spool = Spool(output_folder)
 
     # Build the URL for shorts
     if '/shorts' not in channel_url:
@@ -94,132 +612,203 @@ def download_shorts(channel_url, output_folder="videos", sort_by="views", limit=
     ydl_opts = {
         'format': 'bestvideo[ext=mp4][height<=1080]+bestaudio[ext=m4a]/best[ext=mp4]/best',
         # 'outtmpl': os.path.join(output_folder, '%(title)s.%(ext)s'),
-        'outtmpl': os.path.join(output_folder, '%(title).50s.%(ext)s'),
+        # Files are written to the spool's incoming area and moved to output_folder when complete
+        'outtmpl': os.path.join(spool.incoming, '%(title).50s.%(ext)s'),
         'quiet': False,
         'no_warnings': False,
-        'extract_flat': False,
-        'playlist_items': f'1:{limit}',  # Fixed syntax
-        # '
-        'postprocessors': [{
-            'key': 'FFmpegVideoConvertor',
-            'preferedformat': 'mp4',
-        }],
-        'ignoreerrors': True,  # Continue on errors
+        # Separate mp4/m4a streams are only muxed; anything else goes through apply_transcode_policy
+        'merge_output_format': 'mp4',
+        # Errors reach the worker, which classifies them and retries the transient ones
+        'ignoreerrors': False,
+        # Checked on the resolved video (flat listings carry no duration)
+        'match_filter': _duration_filter(),
         'writeinfojson': False,
         'writethumbnail': False,
     }
+    _with_options(ydl_opts, get_governor().ydl_options(priority))
 
-    # Add duration filter for shorts (typically under 60 seconds)
-    if sort_by == 'views':
-        ydl_opts['playlistsort'] = 'view_count'
-        ydl_opts['playlistreverse'] = True
-    else:
-        ydl_opts['playlistsort'] = 'upload_date'
-        ydl_opts['playlistreverse'] = True
-
-    downloaded_count = 0
+    own_archive = archive is None
+    if own_archive:
+        archive = DownloadArchive(ARCHIVE_FILE)
+    _with_options(ydl_opts, _checkpoint_options(archive))
+    own_dedupe_index = skip_duplicates and dedupe_index is None
+    if own_dedupe_index:
+        dedupe_index = NearDuplicateIndex(FINGERPRINT_FILE)
+    if not skip_duplicates:
+        dedupe_index = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            print(f"Extracting video information from channel...")
-            
-            # Extract playlist info
-            playlist_info = ydl.extract_info(channel_url, download=False)
-            
-            if not playlist_info or 'entries' not in playlist_info:
-                print("No videos found or unable to extract playlist info")
-                return False
+        # Downloads interrupted by a crash or restart are resumed first
+        resumed = recover_download_jobs(spool.incoming, archive)
 
-            entries = list(playlist_info['entries'])[:limit]
-            total_videos = len(entries)
-            
-            print(f"Found {total_videos} videos to process")
-            
-            if total_videos == 0:
-                print("No videos found in the channel shorts")
-                return False
+        print(f"Listing videos from channel...")
 
-            for i, entry in enumerate(entries, 1):
-                if entry is None:
-                    continue
+        # Flat listing: only new entries are fetched and only the chosen ones are resolved
+        entries, summary['new_entries'] = list_channel(channel_url, sort_by, limit, archive, listing_ttl)
+        listed_ids = {entry.id for entry in entries}
+        entries = [entry for entry in resumed if entry.id not in listed_ids] + entries
+        total_videos = summary['listed'] = len(entries)
 
-                try:
-                    video_url = entry.get('url') or f"https://www.youtube.com/watch?v={entry.get('id')}"
-                    video_title = entry.get('title', 'Unknown Title')
-                    duration = entry.get('duration', 0)
-                    
-                    print(f"\n[{i}/{total_videos}] Processing: {video_title}")
-                    print(f"Duration: {duration} seconds")
-                    
-                    # Skip videos longer than 60 seconds (not typical shorts)
-                    if duration and duration > 60:
-                        print(f"Skipping (too long): {video_title}")
-                        continue
-                    
-                    # Sanitize filename to check if it already exists
-                    original_filename = f"{video_title}.mp4"
-                    sanitized_filename = sanitize_filename(original_filename)
-                    file_path = os.path.join(output_folder, sanitized_filename)
-
-                    # Check if file already exists
-                    if os.path.exists(file_path):
-                        print(f"✓ Skipping download, file already exists: {sanitized_filename}")
-                        continue
-
-                    # Download the video
-                    download_opts = ydl_opts.copy()
-                    download_opts['extract_flat'] = False
-                    if progress_callback:
-                        progress_callback(i-1, total_videos, f"Downloading: {video_title}")
-                    
-                    with yt_dlp.YoutubeDL(download_opts) as download_ydl:
-                        download_ydl.download([video_url])
-                    
-                    if progress_callback:
-                        progress_callback(i, total_videos, f"Downloaded: {video_title}")
-                    
-                    # Handle file renaming if needed
-                    original_filename = f"{video_title}.mp4"
-                    sanitized_filename = sanitize_filename(original_filename)
-                    
-                    if original_filename != sanitized_filename:
-                        original_path = os.path.join(output_folder, original_filename)
-                        new_path = os.path.join(output_folder, sanitized_filename)
-                        if os.path.exists(original_path):
-                            os.rename(original_path, new_path)
-                            print(f"Renamed file for compatibility")
-                    
-                    downloaded_count += 1
-                    print(f"✓ Downloaded successfully")
-                    
-                except Exception as e:
-                    error_msg = str(e)
-                    if "Sign in to confirm your age" in error_msg:
-                        print(f"⚠ Age-restricted content, skipping: {video_title}")
-                    elif "Private video" in error_msg:
-                        print(f"⚠ Private video, skipping: {video_title}")
-                    elif "Video unavailable" in error_msg:
-                        print(f"⚠ Video unavailable, skipping: {video_title}")
-                    else:
-                        print(f"⚠ Error downloading: {error_msg}")
-                    continue
+        print(f"Found {total_videos} videos to process")
+
+        if total_videos == 0:
+            print("No videos found in the channel shorts")
+            return summary
+
+        with DownloadWorkerPool(ydl_opts, max_workers) as pool:
+            task = lambda worker_ydl, i, entry: _download_entry(
+                worker_ydl, i, entry, spool, total_videos, archive, dedupe_index)
+            for result in pool.run(entries, task, progress_callback):
+                summary['results'].append(result)
+                summary[result['status']] += 1
+                archive.update_upload_watermark(channel_url, result.get('upload_date'))
 
         print(f"\n=== Download Summary ===")
-        print(f"Successfully downloaded: {downloaded_count} videos")
+        print(f"Successfully downloaded: {summary['downloaded']} videos")
+        print(f"Skipped: {summary['skipped']}")
+        print(f"Failed: {summary['failed']}")
         print(f"Total processed: {total_videos}")
         print("Channel download completed!")
-        
-        return downloaded_count > 0
-        
+
     except Exception as e:
         print(f"Error during download setup: {str(e)}")
-        return False
+        summary['error'] = str(e)
+    finally:
+        spool.close()
+        if own_archive:
+            archive.close()
+        if own_dedupe_index:
+            dedupe_index.close()
+
+    return summary
+
+def download_shorts(channel_url, output_folder="videos", sort_by="views", limit=5, progress_callback=None,
+                    max_workers=DEFAULT_MAX_WORKERS, archive=None, listing_ttl=DEFAULT_LISTING_TTL,
+                    skip_duplicates=True, dedupe_index=None):
+    """
+    Download shorts from a YouTube channel
+    channel_url: URL of the YouTube channel
+    output_folder: Folder to save the downloaded videos
+    sort_by: How to sort videos ('views' or 'date')
+    limit: Maximum number of videos to download
+    progress_callback: Optional callback function for progress updates
+    max_workers: Number of videos downloaded concurrently
+    archive: Optional DownloadArchive (defaults to the shared archive file)
+    listing_ttl: Seconds a cached channel listing is reused before re-crawling
+    skip_duplicates: Remove downloads that are near-duplicates of already seen videos
+    dedupe_index: Optional NearDuplicateIndex (defaults to the shared fingerprint file)
+    """
+    summary = crawl_channel(channel_url, output_folder, sort_by, limit, progress_callback,
+                            max_workers, archive, listing_ttl, skip_duplicates, dedupe_index)
+    return summary['downloaded'] > 0
+
+def load_channel_list(path):
+    """
+    Read channel definitions from a text file
+    One channel per line: "<url> [limit] [views|date]"; blank lines and # comments are ignored
+    """
+    channels = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            channel = {'url': parts[0]}
+            if len(parts) > 1:
+                channel['limit'] = int(parts[1])
+            if len(parts) > 2:
+                channel['sort_by'] = parts[2].lower()
+            channels.append(channel)
+    return channels
+
+def _crawl_channel_job(channel, output_folder, max_workers, listing_ttl, ingress_rate):
+    """Process pool entry point: crawl one channel with this process's own yt-dlp instances"""
+    # Every process has its own governor, so each one gets a share of the ingress budget
+    get_governor().configure(ingress_rate=ingress_rate)
+    summary = crawl_channel(
+        channel['url'],
+        output_folder=output_folder,
+        sort_by=channel['sort_by'],
+        limit=channel['limit'],
+        max_workers=max_workers,
+        listing_ttl=listing_ttl,
+        priority=PRIORITY_LOW
+    )
+    summary['channel_url'] = channel['url']
+    return summary
+
+def download_channels_batch(channels, output_folder="videos", sort_by="views", limit=5, max_processes=None,
+                            max_workers=DEFAULT_MAX_WORKERS, listing_ttl=DEFAULT_LISTING_TTL,
+                            progress_callback=None):
+    """
+    Download shorts from many channels, sharded across a process pool
+    channels: List of channel URLs or dicts ({'url', 'limit', 'sort_by'}), or the path of a channel list file
+    output_folder: Folder to save the downloaded videos
+    sort_by: Default sort order for channels that don't set one
+    limit: Default limit for channels that don't set one
+    max_processes: Number of channels crawled at the same time (defaults to the CPU count)
+    max_workers: Number of download workers inside each process
+    progress_callback: Optional callback(completed, total, message), called once per finished channel
+    Returns a dict mapping each channel URL to its summary
+    """
+    if isinstance(channels, str):
+        channels = load_channel_list(channels)
+
+    jobs = []
+    for channel in channels:
+        if isinstance(channel, str):
+            channel = {'url': channel}
+        jobs.append({
+            'url': channel['url'],
+            'limit': int(channel.get('limit') or limit),
+            'sort_by': channel.get('sort_by') or sort_by,
+        })
+
+    if not jobs:
+        print("No channels to download")
+        return {}
+
+    max_processes = max(1, min(max_processes or os.cpu_count() or 1, len(jobs)))
+    print(f"Crawling {len(jobs)} channels with {max_processes} processes")
+
+    ingress_rate = get_governor().ingress.rate // max_processes
+
+    summaries = {}
+    with ProcessPoolExecutor(max_workers=max_processes) as executor:
+        futures = {
+            executor.submit(_crawl_channel_job, job, output_folder, max_workers, listing_ttl, ingress_rate): job
+            for job in jobs
+        }
+        # Channels are collected as they finish, so a slow channel never holds back the others
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                summary = {
+                    'channel_url': job['url'], 'listed': 0, 'new_entries': 0,
+                    'downloaded': 0, 'skipped': 0, 'failed': 0, 'results': [], 'error': str(e),
+                }
+            summaries[job['url']] = summary
+            if progress_callback:
+                progress_callback(len(summaries), len(jobs), f"Finished: {job['url']}")
+
+    print(f"\n=== Batch Summary ===")
+    for url, summary in summaries.items():
+        status = f"error: {summary['error']}" if summary['error'] else "ok"
+        print(f"{url}: {summary['downloaded']} downloaded, {summary['skipped']} skipped, "
+              f"{summary['failed']} failed ({status})")
+    print(f"Total downloaded: {sum(s['downloaded'] for s in summaries.values())} videos "
+          f"from {len(summaries)} channels")
+
+    return summaries
 
 if __name__ == "__main__":
     print("YouTube Video Downloader")
     print("=" * 50)
     
     # Ask user what they want to download
-    download_type = input("What do you want to download?\n1. Single video\n2. Channel videos (shorts)\nEnter choice (1/2): ").strip()
+    download_type = input("What do you want to download?\n1. Single video\n2. Channel videos (shorts)\n3. Multiple channels (from file)\nEnter choice (1/2/3): ").strip()
     
     if download_type == "1":
         # Single video download
@@ -257,6 +846,18 @@ if __name__ == "__main__":
             limit = 50
         
         download_shorts(channel_url, output_folder, sort_by, limit)
+
+    elif download_type == "3":
+        # Batch download
+        print("\n--- Multiple Channels Download ---")
+        channels_file = input("Enter channel list file (one URL per line): ").strip()
+
+        if not channels_file or not os.path.exists(channels_file):
+            print("Channel list file not found. Exiting.")
+            exit()
+
+        output_folder = input("Enter output folder [default: videos]: ").strip() or "videos"
+        download_channels_batch(channels_file, output_folder)
         
     else:
-        print("Invalid choice. Please run the script again and select 1 or 2.")
+        print("Invalid choice. Please run the script again and select 1, 2 or 3.")
@@ -1,13 +1,75 @@
+import os
 import random
-import requests
-from datetime import datetime
+import time
+import threading
+from datetime import datetime, timedelta
 from typing import List, Dict
 import json
+from trending import get_trending_cache
+from category_classifier import CategoryClassifier
+
+# Trending topics used when no trending source answers
+FALLBACK_TRENDING = [
+    'asmr', 'satisfying', 'oddlysatisfying', 'relaxing',
+    'diy', 'howto', 'tutorial', 'learnontiktok',
+    'beforeandafter', 'transformation', 'makeover',
+    'foodie', 'recipe', 'cooking', 'yummy',
+    'workout', 'fitness', 'gym', 'health',
+    'tech', 'gadgets', 'smartphone', 'ai',
+    'travel', 'wanderlust', 'adventure', 'nature'
+]
+
+VIRAL_TITLE_TEMPLATES = [
+    "{emoji} {title} | MUST WATCH! {emoji}",
+    "{emoji} {title} - YOU WON'T BELIEVE THIS!",
+    "{title} {emoji} SHOCKING RESULTS!",
+    "{emoji} {title} | GONE WRONG! {emoji}",
+    "{title} - WAIT FOR IT... {emoji}",
+    "{emoji} {title} | 99% FAIL THIS!",
+    "POV: {title} {emoji} VIRAL",
+    "{title} {emoji} *EMOTIONAL*",
+    "{emoji} IMPOSSIBLE {title} CHALLENGE!",
+    "{title} IN 60 SECONDS! {emoji}"
+]
+
+SEASONAL_HASHTAGS = {
+    (12, 1, 2): ['winter', 'wintervibes', 'cold', 'snow', 'cozy'],
+    (3, 4, 5): ['spring', 'springvibes', 'flowers', 'fresh', 'bloom'],
+    (6, 7, 8): ['summer', 'summervibes', 'sunny', 'hot', 'vacation'],
+    (9, 10, 11): ['fall', 'autumn', 'fallvibes', 'cozy', 'halloween']
+}
+
+# Each keyword occurrence scores 1 for its category; ties go to the category listed first
+CATEGORY_KEYWORDS = {
+    'entertainment': ['funny', 'comedy', 'laugh', 'meme', 'prank', 'fail'],
+    'lifestyle': ['routine', 'day', 'life', 'vlog', 'morning', 'night'],
+    'challenges': ['challenge', 'try', 'impossible', 'dare', '24 hours'],
+    'gaming': ['game', 'gaming', 'play', 'minecraft', 'fortnite', 'roblox'],
+    'tech': ['phone', 'app', 'gadget', 'tech', 'review', 'unboxing'],
+    'food': ['food', 'recipe', 'cooking', 'eating', 'restaurant', 'taste']
+}
+
+def format_hashtag(tag):
+    return f'#{tag.replace(" ", "")}'
+
+FALLBACK_HASHTAGS = [format_hashtag(tag) for tag in FALLBACK_TRENDING]
+
+# Optional JSON keyword dictionary replacing CATEGORY_KEYWORDS: {category: {keyword: weight}}
+CATEGORY_KEYWORDS_FILE = 'category_keywords.json'
+
+DEFAULT_CATEGORY = 'entertainment'
 
 class TrendingHashtagGenerator:
-    """Generate trending hashtags and optimized metadata for YouTube Shorts"""
+    """
+    Generate trending hashtags and optimized metadata for YouTube Shorts
+    One instance can be kept for the life of the process (see get_generator):
+    the time-based and seasonal pools and the pools formatted as hashtags
+    are only recomputed when the date changes.
+    trending: TrendingCache the trending topics are read from (the shared one by default)
+    classifier: CategoryClassifier for analyze_title_for_category (the shared one by default)
+    """
     
-    def __init__(self):
+    def __init__(self, trending=None, classifier=None):
         # Base hashtag categories
         self.hashtag_pools = {
             'viral_2025': [
@@ -49,6 +111,12 @@ class TrendingHashtagGenerator:
         }
         
         self.title_emojis = ['🔥', '😱', '💯', '⚡', '🎯', '✨', '🚀', '💥', '🎬', '📱']
+        self._lock = threading.Lock()
+        self._stale_at = 0.0
+        self._tag_pools = {}
+        self.trending = trending if trending is not None else get_trending_cache()
+        self.classifier = classifier if classifier is not None else get_classifier()
+        self._trending_hashtags = (None, [])
         self.update_time_based_hashtags()
     
     def update_time_based_hashtags(self):
@@ -65,116 +133,101 @@ class TrendingHashtagGenerator:
         ]
         
         # Seasonal hashtags
-        seasons = {
-            (12, 1, 2): ['winter', 'wintervibes', 'cold', 'snow', 'cozy'],
-            (3, 4, 5): ['spring', 'springvibes', 'flowers', 'fresh', 'bloom'],
-            (6, 7, 8): ['summer', 'summervibes', 'sunny', 'hot', 'vacation'],
-            (9, 10, 11): ['fall', 'autumn', 'fallvibes', 'cozy', 'halloween']
-        }
-        
         current_month = now.month
-        for months, tags in seasons.items():
+        for months, tags in SEASONAL_HASHTAGS.items():
             if current_month in months:
                 self.hashtag_pools['seasonal'] = tags
                 break
+        
+        # Pools as ready-made hashtags, rebuilt with the date-dependent ones
+        self._tag_pools = {name: [format_hashtag(tag) for tag in tags] for name, tags in self.hashtag_pools.items()}
+        tomorrow = now.date() + timedelta(days=1)
+        self._stale_at = datetime(tomorrow.year, tomorrow.month, tomorrow.day).timestamp()
+    
+    def refresh_if_stale(self):
+        """Recompute the date-dependent pools if the date changed since they were built"""
+        if time.time() >= self._stale_at:
+            with self._lock:
+                if time.time() >= self._stale_at:
+                    self.update_time_based_hashtags()
+    
+    def _trending_tags(self):
+        """The cached trending topics as hashtags (formatted again only when the topics change)"""
+        topics = self.trending.get()
+        cached = self._trending_hashtags
+        if cached[0] is not topics:
+            cached = self._trending_hashtags = (topics, [format_hashtag(tag) for tag in topics])
+        return cached[1]
     
     def get_trending_from_api(self) -> List[str]:
         """
-        Attempt to get trending topics from various sources
-        Note: Most require API keys, this is a template
+        Trending topics from the trending cache, or 5 random fallback topics
+        Never waits for the network: the cache is refreshed in the background.
         """
-        trending = []
-        
-            # Example: RapidAPI trending hashtags (requires API key)
-            # Uncomment and add your API key to use
-        """
-        try:
-            url = "https://hashtagy-generate-hashtags.p.rapidapi.com/v1/trending"
-            headers = {
-                "X-RapidAPI-Key": "YOUR_RAPIDAPI_KEY",
-                "X-RapidAPI-Host": "hashtagy-generate-hashtags.p.rapidapi.com"
-            }
-            response = requests.get(url, headers=headers, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                trending = data.get('tags', [])[:10]
-        except:
-            pass
-        """
-        
-        # Fallback trending topics (updated regularly in production)
-        fallback_trending = [
-            'asmr', 'satisfying', 'oddlysatisfying', 'relaxing',
-            'diy', 'howto', 'tutorial', 'learnontiktok',
-            'beforeandafter', 'transformation', 'makeover',
-            'foodie', 'recipe', 'cooking', 'yummy',
-            'workout', 'fitness', 'gym', 'health',
-            'tech', 'gadgets', 'smartphone', 'ai',
-            'travel', 'wanderlust', 'adventure', 'nature'
-        ]
-        
-        return trending if trending else random.sample(fallback_trending, 5)
+        topics = self.trending.get()
+        return list(topics) if topics else random.sample(FALLBACK_TRENDING, 5)
     
     def generate_hashtags(self, video_title: str = "", category: str = None, count: int = 30) -> List[str]:
         """Generate optimized hashtags for maximum reach"""
+        self.refresh_if_stale()
+        return self._hashtags(video_title, category, count, self._tag_pools, self._trending_tags())
+    
+    def generate_hashtags_batch(self, titles: List[str], categories: List[str] = None, count: int = 30) -> List[List[str]]:
+        """
+        Hashtags of many titles, in order (categories are classified in one pass when left out)
+        The date check and the trending lookup are done once for the whole batch.
+        """
+        self.refresh_if_stale()
+        pools, trending = self._tag_pools, self._trending_tags()
+        if categories is None:
+            categories = self.analyze_titles_for_category(titles)
+        return [self._hashtags(title, category, count, pools, trending) for title, category in zip(titles, categories)]
+    
+    def _hashtags(self, video_title, category, count, pools, trending):
+        """Pick the hashtags of one title from the given pools and trending hashtags"""
+        sample = random.sample
         hashtags = []
         
         # Core viral hashtags (always include)
-        hashtags.extend(random.sample(self.hashtag_pools['viral_2025'], 5))
+        hashtags.extend(sample(pools['viral_2025'], 5))
         
         # Shorts specific
-        hashtags.extend(random.sample(self.hashtag_pools['shorts_specific'], 4))
+        hashtags.extend(sample(pools['shorts_specific'], 4))
         
         # Time-based hashtags
-        hashtags.extend(random.sample(self.hashtag_pools['time_based'], 3))
+        hashtags.extend(sample(pools['time_based'], 3))
         
         # Seasonal if available
-        if self.hashtag_pools.get('seasonal'):
-            hashtags.extend(random.sample(self.hashtag_pools['seasonal'], 2))
+        if pools.get('seasonal'):
+            hashtags.extend(sample(pools['seasonal'], 2))
         
         # Category specific
-        if category and category in self.hashtag_pools:
-            hashtags.extend(random.sample(self.hashtag_pools[category], 3))
+        if category and category in pools:
+            hashtags.extend(sample(pools[category], 3))
         
         # Engagement hashtags
-        hashtags.extend(random.sample(self.hashtag_pools['engagement'], 2))
+        hashtags.extend(sample(pools['engagement'], 2))
         
         # Trending from API
-        hashtags.extend(self.get_trending_from_api())
+        hashtags.extend(trending or sample(FALLBACK_HASHTAGS, 5))
         
         # Title-based hashtags (extract words from title)
         if video_title:
             title_words = video_title.lower().split()
             for word in title_words[:3]:
                 if len(word) > 3 and word.isalnum():
-                    hashtags.append(word)
+                    hashtags.append(f'#{word}')
         
         # Remove duplicates and limit
-        hashtags = list(dict.fromkeys(hashtags))[:count]
-        
-        # Format with # symbol
-        return [f'#{tag.replace(" ", "")}' for tag in hashtags]
+        return list(dict.fromkeys(hashtags))[:count]
     
     def generate_viral_title(self, original_title: str) -> str:
         """Generate viral-optimized title with emojis"""
-        templates = [
-            "{emoji} {title} | MUST WATCH! {emoji}",
-            "{emoji} {title} - YOU WON'T BELIEVE THIS!",
-            "{title} {emoji} SHOCKING RESULTS!",
-            "{emoji} {title} | GONE WRONG! {emoji}",
-            "{title} - WAIT FOR IT... {emoji}",
-            "{emoji} {title} | 99% FAIL THIS!",
-            "POV: {title} {emoji} VIRAL",
-            "{title} {emoji} *EMOTIONAL*",
-            "{emoji} IMPOSSIBLE {title} CHALLENGE!",
-            "{title} IN 60 SECONDS! {emoji}"
-        ]
-        
         # Clean title
         clean_title = original_title[:50] if len(original_title) > 50 else original_title
         
         # Select random template and emojis
-        template = random.choice(templates)
+        template = random.choice(VIRAL_TITLE_TEMPLATES)
         emoji = random.choice(self.title_emojis)
         
         # Format title
@@ -236,23 +289,73 @@ best shorts, must watch, viral videos, {' '.join([h.replace('#', '') for h in ha
         }
     
     def analyze_title_for_category(self, title: str) -> str:
-        """Analyze title to determine best category"""
-        title_lower = title.lower()
-        
-        category_keywords = {
-            'entertainment': ['funny', 'comedy', 'laugh', 'meme', 'prank', 'fail'],
-            'lifestyle': ['routine', 'day', 'life', 'vlog', 'morning', 'night'],
-            'challenges': ['challenge', 'try', 'impossible', 'dare', '24 hours'],
-            'gaming': ['game', 'gaming', 'play', 'minecraft', 'fortnite', 'roblox'],
-            'tech': ['phone', 'app', 'gadget', 'tech', 'review', 'unboxing'],
-            'food': ['food', 'recipe', 'cooking', 'eating', 'restaurant', 'taste']
-        }
-        
-        for category, keywords in category_keywords.items():
-            if any(keyword in title_lower for keyword in keywords):
-                return category
-        
-        return 'entertainment'  # default category
+        """Analyze title to determine best category (highest weighted keyword score)"""
+        return self.classifier.classify(title)
+    
+    def analyze_titles_for_category(self, titles: List[str]) -> List[str]:
+        """Best category of each title, in order"""
+        return self.classifier.classify_batch(titles)
+
+_shared_generator = None
+_shared_classifier = None
+_shared_lock = threading.Lock()
+_classifier_lock = threading.Lock()
+
+def get_classifier():
+    """Return the process-wide CategoryClassifier (CATEGORY_KEYWORDS_FILE if it exists, else CATEGORY_KEYWORDS)"""
+    global _shared_classifier
+    with _classifier_lock:
+        if _shared_classifier is None:
+            if os.path.exists(CATEGORY_KEYWORDS_FILE):
+                _shared_classifier = CategoryClassifier.from_file(CATEGORY_KEYWORDS_FILE, default=DEFAULT_CATEGORY)
+            else:
+                _shared_classifier = CategoryClassifier(CATEGORY_KEYWORDS, default=DEFAULT_CATEGORY)
+        return _shared_classifier
+
+def get_generator():
+    """Return the process-wide TrendingHashtagGenerator"""
+    global _shared_generator
+    with _shared_lock:
+        if _shared_generator is None:
+            _shared_generator = TrendingHashtagGenerator()
+        return _shared_generator
+
+def generate_basic_metadata(video_title):
+    """Generate basic metadata for a video"""
+    
+    generator = get_generator()
+    
+    # Test with a sample title
+    original_title = video_title
+    
+    # Generate viral title
+    viral_title = generator.generate_viral_title(original_title)
+
+    
+    # Analyze category
+    category = generator.analyze_title_for_category(original_title)
+
+    
+    # Generate hashtags
+    tags = generator.generate_hashtags(original_title, category)
+
+
+    description = generator.generate_description(viral_title, tags)
+    
+    return description, tags
+
+def generate_metadata_batch(titles):
+    """
+    Generate metadata for many videos at once; returns a list of (description, tags) in title order
+    The categories are worked out in one classifier pass and the hashtags
+    drawn with one date check and one trending lookup for the whole batch.
+    """
+    generator = get_generator()
+    titles = list(titles)
+    viral_title = generator.generate_viral_title
+    describe = generator.generate_description
+    return [(describe(viral_title(title), tags), tags)
+            for title, tags in zip(titles, generator.generate_hashtags_batch(titles))]
 
 # Example usage function
 def test_generator():
@@ -0,0 +1,218 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Default location of the upload journal
+JOURNAL_FILE = 'upload_journal.db'
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm')
+
+# Upload states of a file
+DISCOVERED = 'discovered'   # found in the folder, not uploaded yet
+UPLOADING = 'uploading'     # upload in progress (a crash leaves it here; it is resumed once stale)
+UPLOADED = 'uploaded'       # published, video_id known
+SCHEDULED = 'scheduled'     # uploaded as private with a publish time, video_id known
+FAILED = 'failed'           # last attempt failed, retried next run
+SKIPPED = 'skipped'         # not uploaded on purpose (near-duplicate)
+DELETED = 'deleted'         # file removed after a confirmed upload
+
+# States picked up by the next upload run
+PENDING_STATES = (DISCOVERED, UPLOADING, FAILED)
+
+# An uploading file not touched for this long (seconds) was left behind by a run that died,
+# so another run may claim it; live uploads call touch_upload well within this
+STALE_UPLOAD_AGE = 600
+
+# States that mean YouTube has the video, so the local file may be deleted
+CONFIRMED_STATES = (UPLOADED, SCHEDULED)
+
+class UploadJournal:
+    """
+    Persistent state machine tracking every video file through its upload.
+    Each transition is a single transaction guarded by the expected current
+    state, so reruns are idempotent: a file confirmed as uploaded is never
+    uploaded again and only confirmed uploads are ever deleted. Folders are
+    only listed again when their modification time changed; otherwise the
+    pending files come straight from the (folder, state) index.
+    """
+
+    def __init__(self, db_path=JOURNAL_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS uploads (
+                    path TEXT PRIMARY KEY,
+                    folder TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    size INTEGER,
+                    mtime REAL,
+                    state TEXT NOT NULL,
+                    video_id TEXT,
+                    publish_time TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_uploads_folder_state ON uploads (folder, state)")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS scanned_folders (
+                    folder TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    scanned_at REAL NOT NULL
+                )
+            """)
+
+    def scan(self, folder):
+        """
+        Bring the journal up to date with the files in a folder
+        The folder is only listed when its modification time changed since the
+        last scan. New files are added as discovered; a path that now holds a
+        different file than the one uploaded or deleted starts over; files
+        that disappeared without a confirmed upload are dropped.
+        """
+        folder = os.path.abspath(folder)
+        folder_mtime = os.stat(folder).st_mtime_ns
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT mtime_ns FROM scanned_folders WHERE folder = ?", (folder,)
+            ).fetchone()
+        if row is not None and row['mtime_ns'] == folder_mtime:
+            return
+
+        with os.scandir(folder) as it:
+            files = {
+                entry.path: entry.stat()
+                for entry in it
+                if entry.is_file() and entry.name.lower().endswith(VIDEO_EXTENSIONS)
+            }
+        now = time.time()
+        with self._lock, self._conn:
+            known = {
+                r['path']: r for r in self._conn.execute(
+                    "SELECT path, size, mtime, state FROM uploads WHERE folder = ?", (folder,)
+                )
+            }
+            for path, stat in files.items():
+                existing = known.get(path)
+                if existing is None:
+                    self._conn.execute(
+                        "INSERT INTO uploads (path, folder, file_name, size, mtime, state, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (path, folder, os.path.basename(path), stat.st_size, stat.st_mtime, DISCOVERED, now)
+                    )
+                elif existing['size'] != stat.st_size or existing['mtime'] != stat.st_mtime:
+                    if existing['state'] in CONFIRMED_STATES + (DELETED, SKIPPED):
+                        self._conn.execute(
+                            "UPDATE uploads SET size = ?, mtime = ?, state = ?, video_id = NULL, "
+                            "publish_time = NULL, error = NULL, attempts = 0, updated_at = ? WHERE path = ?",
+                            (stat.st_size, stat.st_mtime, DISCOVERED, now, path)
+                        )
+                    else:
+                        self._conn.execute(
+                            "UPDATE uploads SET size = ?, mtime = ?, updated_at = ? WHERE path = ?",
+                            (stat.st_size, stat.st_mtime, now, path)
+                        )
+            gone = [path for path, r in known.items() if path not in files and r['state'] in PENDING_STATES + (SKIPPED,)]
+            self._conn.executemany("DELETE FROM uploads WHERE path = ?", [(path,) for path in gone])
+            self._conn.execute(
+                "INSERT INTO scanned_folders (folder, mtime_ns, scanned_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(folder) DO UPDATE SET mtime_ns = excluded.mtime_ns, scanned_at = excluded.scanned_at",
+                (folder, folder_mtime, now)
+            )
+
+    def _files_in_states(self, folder, states):
+        placeholders = ', '.join('?' for _ in states)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM uploads WHERE folder = ? AND state IN ({placeholders}) ORDER BY file_name",
+                (os.path.abspath(folder),) + tuple(states)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def pending(self, folder):
+        """Files of a folder still waiting for an upload, in file name order"""
+        return self._files_in_states(folder, PENDING_STATES)
+
+    def confirmed(self, folder):
+        """Files of a folder whose upload YouTube confirmed"""
+        return self._files_in_states(folder, CONFIRMED_STATES)
+
+    def get(self, path):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM uploads WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _transition(self, path, from_states, state, **fields):
+        """Move a file to state if it is in one of from_states; returns False otherwise"""
+        assignments = ''.join(f", {name} = ?" for name in fields)
+        placeholders = ', '.join('?' for _ in from_states)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                f"UPDATE uploads SET state = ?, updated_at = ?{assignments} "
+                f"WHERE path = ? AND state IN ({placeholders})",
+                (state, time.time(), *fields.values(), os.path.abspath(path), *from_states)
+            )
+        return cursor.rowcount == 1
+
+    def begin_upload(self, path, stale_age=STALE_UPLOAD_AGE):
+        """
+        Claim a pending file for uploading; False if it was already uploaded, is
+        being uploaded by another run (or is unknown)
+        The check and the claim are one UPDATE, so of two concurrent runs only
+        one gets the file. An uploading row is only taken over once it has not
+        been touched for stale_age seconds.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE uploads SET state = ?, attempts = attempts + 1, error = NULL, updated_at = ? "
+                "WHERE path = ? AND (state IN (?, ?) OR (state = ? AND updated_at < ?))",
+                (UPLOADING, now, os.path.abspath(path), DISCOVERED, FAILED, UPLOADING, now - stale_age)
+            )
+        return cursor.rowcount == 1
+
+    def touch_upload(self, path):
+        """Show that an upload is still alive, so no other run takes it over"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE uploads SET updated_at = ? WHERE path = ? AND state = ?",
+                (time.time(), os.path.abspath(path), UPLOADING)
+            )
+
+    def finish_upload(self, path, video_id, publish_time=None):
+        """Record a confirmed upload (scheduled when it has a publish time)"""
+        state = SCHEDULED if publish_time else UPLOADED
+        return self._transition(path, (UPLOADING,), state, video_id=video_id, publish_time=publish_time)
+
+    def fail_upload(self, path, error=None):
+        return self._transition(path, (UPLOADING,), FAILED, error=error)
+
+    def defer_upload(self, path):
+        """Put an upload that was started back in the queue (quota ran out before it)"""
+        return self._transition(path, (UPLOADING,), DISCOVERED)
+
+    def skip(self, path, reason=None):
+        """Exclude a pending file from uploads (e.g. a near-duplicate)"""
+        return self._transition(path, PENDING_STATES, SKIPPED, error=reason)
+
+    def mark_deleted(self, path):
+        """Record that the file of a confirmed upload was removed"""
+        return self._transition(path, CONFIRMED_STATES, DELETED)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
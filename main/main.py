@@ -1,11 +1,42 @@
 import os
 import streamlit as st
 from download import download_shorts
-from upload import authenticate_youtube, process_video_folder
-import time
+from upload import authenticate_youtube, iter_upload_events, delete_uploaded_videos
+from upload_events import UploadProgress, RunFinished, QUEUED, RESTARTED
+from quota import QuotaLedger, QUOTA_FILE
 from datetime import datetime, timedelta
 import pytz
 
+def upload_with_progress(youtube, folder_path, **options):
+    """Upload a folder in a single pass, driving a progress bar from its upload events; returns the results"""
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    total_bytes, sent_bytes = {}, {}
+    results = []
+    for event in iter_upload_events(youtube, folder_path, **options):
+        if isinstance(event, RunFinished):
+            results = event.results
+            break
+        if isinstance(event, UploadProgress):
+            sent_bytes[event.path] = event.bytes_sent
+            rate = f" at {event.rate / (1024*1024):.1f} MB/s" if event.rate else ""
+            eta = f", {event.eta:.0f}s left" if event.eta is not None else ""
+            status_text.text(f"Uploading {event.file}: {event.fraction:.0%}{rate}{eta}")
+        else:
+            if event.state == QUEUED:
+                total_bytes[event.path] = event.total_bytes
+            elif event.state == RESTARTED:
+                sent_bytes[event.path] = 0
+            elif event.final:
+                # Files that end without uploading count as done, so the bar still reaches the end
+                sent_bytes[event.path] = total_bytes.get(event.path, 0)
+            status_text.text(f"{event.file}: {event.state.replace('_', ' ')}")
+        if total_bytes:
+            progress_bar.progress(min(100, int(sum(sent_bytes.values()) * 100 / sum(total_bytes.values()))))
+    progress_bar.empty()
+    status_text.empty()
+    return results
+
 def main():
     st.set_page_config(page_title="Mitovoid Content Manager", page_icon="⚡")
     
@@ -24,6 +55,7 @@ def main():
         channel_url = st.text_input("Enter YouTube channel URL:")
         sort_by = st.selectbox("Sort videos by:", ["views", "date"], index=0)
         limit = st.number_input("Number of videos to download:", min_value=1, max_value=100, value=50)
+        max_workers = st.number_input("Parallel downloads:", min_value=1, max_value=16, value=4)
         if st.button("Start Download"):
             if not channel_url:
                 st.error("Please enter a YouTube channel URL")
@@ -42,7 +74,8 @@ def main():
                         output_folder=output_folder,
                         sort_by=sort_by,
                         limit=int(limit),
-                        progress_callback=update_progress
+                        progress_callback=update_progress,
+                        max_workers=int(max_workers)
                     )
 
                     progress_bar.empty()
@@ -58,8 +91,15 @@ def main():
         if not os.path.exists(output_folder) or not any(f.endswith((".mp4", ".mkv", ".avi")) for f in os.listdir(output_folder)):
             st.warning("No videos found in the videos folder. Please download some videos first.")
         else:
+            with QuotaLedger(QUOTA_FILE) as quota_ledger:
+                quota = quota_ledger.status()
+            ist = pytz.timezone('Asia/Kolkata')
+            st.info(f"API quota today: {quota['remaining']} of {quota['limit']} units left "
+                    f"(about {quota['uploads_remaining']} uploads), resets at "
+                    f"{quota['reset_at'].astimezone(ist).strftime('%Y-%m-%d %I:%M %p')} IST")
             st.write("Configure Upload Settings:")
             upload_interval = st.number_input("Hours between each upload:", min_value=1, max_value=24, value=6)
+            max_uploads = st.number_input("Parallel uploads:", min_value=1, max_value=8, value=3)
             use_custom_time = st.checkbox("Set custom start time")
             custom_start = None
             if use_custom_time:
@@ -84,22 +124,21 @@ def main():
                         youtube = authenticate_youtube()
                         if youtube:
                             st.success("Authentication successful!")
-                            with st.spinner("Uploading videos..."):
-                                time.sleep(3)
-                                process_video_folder(
-                                    youtube=youtube,
-                                    folder_path=output_folder,
-                                    schedule_interval=upload_interval,
-                                    start_time=custom_start
-                                )
-                                # Delete uploaded videos
-                                for file in os.listdir(output_folder):
-                                    if file.endswith(('.mp4', '.mkv', '.avi')):
-                                        try:
-                                            os.remove(os.path.join(output_folder, file))
-                                        except Exception as e:
-                                            st.warning(f"Could not delete {file}: {str(e)}")
-                                st.success(f"Videos have been scheduled for upload with {upload_interval} hour intervals and cleared from the folder.")
+                            results = upload_with_progress(
+                                youtube,
+                                output_folder,
+                                schedule_interval=upload_interval,
+                                start_time=custom_start,
+                                max_concurrent_uploads=int(max_uploads)
+                            )
+                            for result in results:
+                                if result['status'] == 'failed':
+                                    st.warning(f"Upload failed: {result['file']}" + (f" ({result['error']})" if result['error'] else ""))
+                            # Delete only the videos YouTube confirmed
+                            deleted, errors = delete_uploaded_videos(output_folder)
+                            for file, error in errors.items():
+                                st.warning(f"Could not delete {file}: {error}")
+                            st.success(f"Videos have been scheduled for upload with {upload_interval} hour intervals; {len(deleted)} uploaded videos cleared from the folder.")
                         else:
                             st.error("Authentication failed. Please check your credentials.")
                     except Exception as e:
@@ -137,41 +176,28 @@ def main():
                 except Exception as e:
                     st.error(f"Download failed: {e}")
                     return
-            with st.spinner("Authenticating and uploading videos..."):
+            with st.spinner("Authenticating with YouTube..."):
                 try:
                     youtube = authenticate_youtube()
-                    video_files = [f for f in os.listdir(output_folder) if f.endswith(('.mp4', '.mkv', '.avi'))]
-                    total_videos = len(video_files)
-                    
-                    if total_videos > 0:
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        for index, file in enumerate(video_files):
-                            progress = int((index / total_videos) * 100)
-                            status_text.text(f"Uploading: {file}")
-                            progress_bar.progress(progress)
-                            
-                            # Process this video
-                            process_video_folder(
-                                youtube=youtube,
-                                folder_path=output_folder,
-                                schedule_interval=interval if schedule else None,
-                                start_time=custom_start if schedule else None
-                            )
-                            
-                            # Delete the uploaded video
-                            try:
-                                os.remove(os.path.join(output_folder, file))
-                            except Exception as e:
-                                st.warning(f"Could not delete {file}: {str(e)}")
-                        
-                        progress_bar.progress(100)
-                        progress_bar.empty()
-                        status_text.empty()
-                        st.success("Upload complete! All videos have been processed and cleared from the folder.")
                 except Exception as e:
-                    st.error(f"Upload failed: {e}")
+                    st.error(f"Authentication failed: {e}")
+                    return
+            try:
+                # One pass over the folder; every file is uploaded at most once
+                results = upload_with_progress(
+                    youtube,
+                    output_folder,
+                    schedule_interval=interval if schedule else None,
+                    start_time=custom_start if schedule else None
+                )
+                if results:
+                    # Delete only the videos YouTube confirmed
+                    deleted, errors = delete_uploaded_videos(output_folder)
+                    for file, error in errors.items():
+                        st.warning(f"Could not delete {file}: {error}")
+                    st.success(f"Upload complete! {len(deleted)} uploaded videos have been cleared from the folder.")
+            except Exception as e:
+                st.error(f"Upload failed: {e}")
 if __name__ == "__main__":
     try:
         main()
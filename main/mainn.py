@@ -1,7 +1,7 @@
 import os
 import streamlit as st
 from download import download_shorts
-from upload import authenticate_youtube, process_video_folder
+from upload import authenticate_youtube, process_video_folder, delete_uploaded_videos
 import time
 from datetime import datetime, timedelta
 import pytz
@@ -136,15 +136,11 @@ def main_app():
                                 )
                                 st.success("✅ Upload process completed!")
                                 
-                                # Cleanup
-                                cleanup_count = 0
-                                for file in files:
-                                    try:
-                                        os.remove(os.path.join(output_folder, file))
-                                        cleanup_count += 1
-                                    except Exception as e:
-                                        st.warning(f"⚠️ Could not delete {file}: {str(e)}")
-                                st.success(f"🗑️ Cleanup completed! {cleanup_count} files removed.")
+                                # Cleanup (only videos whose upload was confirmed)
+                                deleted, errors = delete_uploaded_videos(output_folder)
+                                for file, error in errors.items():
+                                    st.warning(f"⚠️ Could not delete {file}: {error}")
+                                st.success(f"🗑️ Cleanup completed! {len(deleted)} files removed.")
                         else:
                             st.error("❌ Authentication failed.")
                     except Exception as e:
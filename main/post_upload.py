@@ -0,0 +1,234 @@
+import os
+import time
+import mimetypes
+import threading
+from datetime import datetime
+import googleapiclient.http
+
+# videos().list accepts up to this many ids per call
+MAX_IDS_PER_LIST = 50
+
+# Requests grouped in one batch HTTP call
+BATCH_SIZE = 50
+
+# Seconds between two rounds of the processing status poller
+POLL_INTERVAL = 15
+
+# An image next to a video with one of these extensions is its custom thumbnail ("clip.mp4" -> "clip.jpg")
+THUMBNAIL_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def fetch_videos(youtube, video_ids, part="status,processingDetails", quota_ledger=None, http=None):
+    """
+    Fetch several videos with one videos().list call per 50 ids
+    Returns {video_id: resource}; ids YouTube doesn't know are missing from the result.
+    """
+    videos = {}
+    video_ids = list(dict.fromkeys(video_ids))
+    for chunk in _chunks(video_ids, MAX_IDS_PER_LIST):
+        request = youtube.videos().list(part=part, id=','.join(chunk), maxResults=MAX_IDS_PER_LIST)
+        if quota_ledger:
+            quota_ledger.record('videos.list')
+        response = request.execute(http=http)
+        for item in response.get('items', []):
+            videos[item['id']] = item
+    return videos
+
+def execute_batch(youtube, requests, method=None, quota_ledger=None, http=None):
+    """
+    Execute API requests in batch HTTP calls of BATCH_SIZE requests
+    Batches can't carry media uploads, so thumbnails().set has to be sent on its own.
+    method: API method name (e.g. 'playlistItems.insert') for quota accounting
+    Returns a list of (response, exception) in the order of the requests.
+    """
+    results = [None] * len(requests)
+
+    def callback(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    for start in range(0, len(requests), BATCH_SIZE):
+        batch = youtube.new_batch_http_request(callback=callback)
+        for index in range(start, min(start + BATCH_SIZE, len(requests))):
+            batch.add(requests[index], request_id=str(index))
+        if quota_ledger and method:
+            quota_ledger.record(method, calls=min(BATCH_SIZE, len(requests) - start))
+        batch.execute(http=http)
+    return results
+
+def add_to_playlist(youtube, playlist_id, video_ids, quota_ledger=None, http=None):
+    """
+    Add videos to a playlist with batched playlistItems().insert calls
+    Returns {video_id: error message} for the videos that could not be added.
+    """
+    requests = [
+        youtube.playlistItems().insert(part="snippet", body={
+            "snippet": {
+                "playlistId": playlist_id,
+                "resourceId": {"kind": "youtube#video", "videoId": video_id}
+            }
+        })
+        for video_id in video_ids
+    ]
+    results = execute_batch(youtube, requests, 'playlistItems.insert', quota_ledger, http)
+    return {
+        video_id: str(exception)
+        for video_id, (_, exception) in zip(video_ids, results)
+        if exception is not None
+    }
+
+def find_thumbnail(video_path):
+    """Path of the custom thumbnail image next to a video file, or None"""
+    base = os.path.splitext(video_path)[0]
+    for extension in THUMBNAIL_EXTENSIONS:
+        if os.path.exists(base + extension):
+            return base + extension
+    return None
+
+def set_thumbnails(youtube, thumbnails, quota_ledger=None, http=None):
+    """
+    Set the custom thumbnails of uploaded videos
+    thumbnails: {video_id: image path}
+    thumbnails().set carries the image as a media upload, which batch requests
+    can't hold, so this is the one follow-up call made per video.
+    Returns {video_id: error message} for the thumbnails that could not be set.
+    """
+    errors = {}
+    for video_id, image_path in thumbnails.items():
+        mimetype = mimetypes.guess_type(image_path)[0] or 'image/jpeg'
+        request = youtube.thumbnails().set(
+            videoId=video_id,
+            media_body=googleapiclient.http.MediaFileUpload(image_path, mimetype=mimetype)
+        )
+        if quota_ledger:
+            quota_ledger.record('thumbnails.set')
+        try:
+            request.execute(http=http)
+        except Exception as e:
+            errors[video_id] = str(e)
+    return errors
+
+def verify_publish_times(youtube, expected, quota_ledger=None, http=None):
+    """
+    Check that scheduled videos carry the publish time they were uploaded with
+    expected: {video_id: publish time (ISO 8601)}
+    Returns {video_id: publishAt reported by YouTube (None if missing)} for the mismatches.
+    """
+    videos = fetch_videos(youtube, list(expected), part="status", quota_ledger=quota_ledger, http=http)
+    mismatches = {}
+    for video_id, publish_time in expected.items():
+        actual = videos.get(video_id, {}).get('status', {}).get('publishAt')
+        if not actual or _parse_time(actual) != _parse_time(publish_time):
+            mismatches[video_id] = actual
+    return mismatches
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(microsecond=0)
+    except (AttributeError, ValueError):
+        return value
+
+class ProcessingPoller:
+    """
+    Single poller following the processing status of every in-flight video.
+    Videos are registered as their uploads finish; each round fetches all of
+    them with one videos().list call per 50 ids, instead of one poll loop
+    (and one request per round) per video.
+    """
+
+    def __init__(self, youtube, interval=POLL_INTERVAL, quota_ledger=None, http=None):
+        self.youtube = youtube
+        self.interval = interval
+        self.quota_ledger = quota_ledger
+        self.http = http
+        self._pending = set()
+        self._results = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def watch(self, video_id):
+        """Follow the processing of an uploaded video"""
+        with self._cond:
+            if video_id in self._results:
+                return
+            self._pending.add(video_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="processing-poller", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                video_ids = sorted(self._pending)
+            try:
+                videos = fetch_videos(self.youtube, video_ids, "status,processingDetails", self.quota_ledger, self.http)
+            except Exception as e:
+                print(f"Warning: Processing status poll failed: {str(e)}")
+                videos = {}
+                failed_poll = True
+            else:
+                failed_poll = False
+            with self._cond:
+                for video_id in video_ids:
+                    video = videos.get(video_id)
+                    if video is None and failed_poll:
+                        continue
+                    if video is None:
+                        # Deleted or rejected before it could be listed
+                        self._finish(video_id, {'processing_status': 'not_found', 'upload_status': None,
+                                                'failure_reason': None})
+                        continue
+                    processing = video.get('processingDetails', {}).get('processingStatus')
+                    if processing != 'processing':
+                        status = video.get('status', {})
+                        self._finish(video_id, {
+                            'processing_status': processing,
+                            'upload_status': status.get('uploadStatus'),
+                            'failure_reason': status.get('failureReason') or status.get('rejectionReason'),
+                        })
+                self._cond.notify_all()
+                # Videos registered meanwhile wait for the next round, so they share its request
+                deadline = time.monotonic() + self.interval
+                while self._pending and not self._stopped and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+
+    def _finish(self, video_id, status):
+        self._pending.discard(video_id)
+        self._results[video_id] = status
+
+    def wait(self, timeout=None):
+        """
+        Wait until every watched video finished processing (or timeout seconds)
+        Returns {video_id: status dict}; videos still processing are missing.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return dict(self._results)
+
+    def stop(self):
+        """Stop polling and wait for a round in progress, so nothing uses the quota ledger afterwards"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
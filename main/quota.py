@@ -0,0 +1,169 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# Default location of the quota ledger
+QUOTA_FILE = 'quota_ledger.db'
+
+# Default daily quota of a Google Cloud project (override with YT_DAILY_QUOTA)
+DEFAULT_DAILY_QUOTA = 10000
+
+# Quota units charged per call (YouTube Data API v3 quota calculator)
+API_COSTS = {
+    'videos.insert': 1600,
+    'videos.list': 1,
+    'videos.update': 50,
+    'videos.delete': 50,
+    'thumbnails.set': 50,
+    'channels.list': 1,
+    'playlistItems.insert': 50,
+}
+
+# Quota days start at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+
+# Pseudo-method marking a day on which the API reported quotaExceeded
+EXHAUSTED_MARKER = '_exhausted'
+
+def quota_day(now=None):
+    """The quota day (YYYY-MM-DD, Pacific time) containing now"""
+    now = now or datetime.now(QUOTA_TIMEZONE)
+    return now.astimezone(QUOTA_TIMEZONE).strftime('%Y-%m-%d')
+
+def next_reset(now=None):
+    """Time at which the quota resets next (the coming Pacific midnight)"""
+    now = (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE)
+    tomorrow = now.date() + timedelta(days=1)
+    return datetime(tomorrow.year, tomorrow.month, tomorrow.day, tzinfo=QUOTA_TIMEZONE)
+
+def project_id_from_secrets(path='client_secrets.json'):
+    """Google Cloud project of the OAuth client (quota is counted per project)"""
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError):
+        return 'default'
+    for section in ('installed', 'web'):
+        if isinstance(config.get(section), dict) and config[section].get('project_id'):
+            return config[section]['project_id']
+    return 'default'
+
+class QuotaLedger:
+    """
+    Persistent per-project, per-day record of the API quota spent.
+    Every call is recorded with its cost; uploads reserve their cost before
+    they start, so concurrent workers (and processes sharing the ledger file)
+    can't admit more uploads than the quota left for the day.
+    """
+
+    def __init__(self, db_path=QUOTA_FILE, project=None, daily_limit=None):
+        self.db_path = db_path
+        self.project = project or project_id_from_secrets()
+        self.daily_limit = int(daily_limit or os.environ.get('YT_DAILY_QUOTA') or DEFAULT_DAILY_QUOTA)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS quota_usage (
+                    project TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    units INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (project, day, method)
+                )
+            """)
+
+    def _add(self, method, units, calls=1):
+        self._conn.execute("""
+            INSERT INTO quota_usage (project, day, method, calls, units) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(project, day, method) DO UPDATE SET
+                calls = calls + excluded.calls,
+                units = units + excluded.units
+        """, (self.project, quota_day(), method, calls, units))
+
+    def _used(self):
+        row = self._conn.execute(
+            "SELECT COALESCE(SUM(units), 0) FROM quota_usage WHERE project = ? AND day = ?",
+            (self.project, quota_day())
+        ).fetchone()
+        return row[0]
+
+    def record(self, method, calls=1):
+        """Record calls of an API method (e.g. 'videos.list') against today's quota"""
+        with self._lock:
+            self._add(method, API_COSTS.get(method, 1) * calls, calls)
+
+    def try_reserve(self, method):
+        """Record one call of method if today's quota still covers it; False otherwise"""
+        cost = API_COSTS.get(method, 1)
+        with self._lock:
+            # BEGIN IMMEDIATE so two processes can't both take the last units
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self._exhausted() or self._used() + cost > self.daily_limit:
+                    return False
+                self._add(method, cost)
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def release(self, method):
+        """Give back a reservation whose call never reached the API"""
+        with self._lock:
+            self._add(method, -API_COSTS.get(method, 1), calls=-1)
+
+    def _exhausted(self):
+        row = self._conn.execute(
+            "SELECT 1 FROM quota_usage WHERE project = ? AND day = ? AND method = ?",
+            (self.project, quota_day(), EXHAUSTED_MARKER)
+        ).fetchone()
+        return row is not None
+
+    def mark_exhausted(self):
+        """Remember that the API rejected a call with quotaExceeded (nothing more is admitted today)"""
+        with self._lock:
+            self._add(EXHAUSTED_MARKER, 0)
+
+    def is_exhausted(self):
+        with self._lock:
+            return self._exhausted()
+
+    def used(self):
+        """Units spent (or reserved) today"""
+        with self._lock:
+            return self._used()
+
+    def remaining(self):
+        """Units left today"""
+        with self._lock:
+            if self._exhausted():
+                return 0
+            return max(0, self.daily_limit - self._used())
+
+    def status(self):
+        """Today's usage as a dict, for display"""
+        remaining = self.remaining()
+        return {
+            'project': self.project,
+            'day': quota_day(),
+            'limit': self.daily_limit,
+            'used': self.used(),
+            'remaining': remaining,
+            'uploads_remaining': remaining // API_COSTS['videos.insert'],
+            'reset_at': next_reset(),
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
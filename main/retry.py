@@ -0,0 +1,241 @@
+import json
+import time
+import random
+import threading
+import http.client
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import httplib2
+import googleapiclient.errors
+import yt_dlp.utils
+import yt_dlp.networking.exceptions
+
+# HTTP statuses worth retrying
+TRANSIENT_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# API error reasons that go away by themselves (403s are permanent otherwise)
+TRANSIENT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError', 'internalError'}
+
+# API error reasons meaning the daily quota is used up
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 60.0
+
+# A circuit opens after this many consecutive transient failures...
+DEFAULT_FAILURE_THRESHOLD = 5
+# ...and lets one trial call through after this many seconds
+DEFAULT_RESET_TIMEOUT = 30.0
+
+class ErrorClass:
+    """Outcome of classify_error: whether retrying makes sense, why, and how long the server asked to wait"""
+
+    __slots__ = ('transient', 'reason', 'status', 'retry_after')
+
+    def __init__(self, transient, reason, status=None, retry_after=None):
+        self.transient = transient
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def quota(self):
+        return self.reason in QUOTA_REASONS
+
+    def __repr__(self):
+        kind = 'transient' if self.transient else 'permanent'
+        return f"<ErrorClass {kind} {self.reason} status={self.status} retry_after={self.retry_after}>"
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit is open"""
+
+    def __init__(self, endpoint, retry_in):
+        super().__init__(f"{endpoint} is failing, not retrying for {retry_in:.0f}s")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+def _parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def _api_reason(error):
+    """First 'reason' of a Google API error response"""
+    try:
+        details = json.loads(error.content)['error']
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    for item in details.get('errors', []):
+        if item.get('reason'):
+            return item['reason']
+    return details.get('status')
+
+def classify_error(error):
+    """
+    Decide if an error is transient (worth retrying) or permanent
+    Google API errors are classified by HTTP status and API reason, yt-dlp
+    errors by their cause and the extractor's 'expected' flag, and network
+    errors are transient. Anything unknown is treated as transient.
+    """
+    if isinstance(error, CircuitOpenError):
+        return ErrorClass(False, 'circuitOpen', retry_after=error.retry_in)
+
+    if isinstance(error, googleapiclient.errors.HttpError):
+        status = error.resp.status
+        reason = _api_reason(error)
+        retry_after = _parse_retry_after(error.resp.get('retry-after'))
+        if reason in QUOTA_REASONS:
+            return ErrorClass(False, reason, status, retry_after)
+        transient = status in TRANSIENT_STATUSES or reason in TRANSIENT_REASONS
+        return ErrorClass(transient, reason or f'http{status}', status, retry_after)
+
+    if isinstance(error, yt_dlp.utils.DownloadError) and error.exc_info and error.exc_info[1] is not None:
+        return classify_error(error.exc_info[1])
+
+    if isinstance(error, yt_dlp.networking.exceptions.HTTPError):
+        retry_after = _parse_retry_after(error.response.headers.get('Retry-After'))
+        return ErrorClass(error.status in TRANSIENT_STATUSES, f'http{error.status}', error.status, retry_after)
+
+    if isinstance(error, yt_dlp.networking.exceptions.TransportError):
+        return ErrorClass(True, 'network')
+
+    if isinstance(error, yt_dlp.utils.ExtractorError):
+        if error.cause is not None and error.cause is not error:
+            return classify_error(error.cause)
+        # 'expected' errors are the site's own answer (private, removed, age-gated...)
+        if error.expected:
+            return ErrorClass(False, 'unavailable')
+        return ErrorClass(True, 'extractor')
+
+    if isinstance(error, (FileNotFoundError, PermissionError, IsADirectoryError)):
+        return ErrorClass(False, 'file')
+
+    if isinstance(error, (OSError, httplib2.HttpLib2Error, http.client.HTTPException)):
+        return ErrorClass(True, 'network')
+
+    return ErrorClass(True, type(error).__name__)
+
+class DecorrelatedJitter:
+    """
+    Decorrelated-jitter backoff: each delay is random between base and three
+    times the previous one, capped at max_delay. Workers that failed
+    together don't retry in lockstep.
+    """
+
+    def __init__(self, base=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY):
+        self.base = base
+        self.max_delay = max_delay
+        self._delay = base
+
+    def next(self):
+        self._delay = min(self.max_delay, random.uniform(self.base, self._delay * 3))
+        return self._delay
+
+    def reset(self):
+        self._delay = self.base
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+    After failure_threshold consecutive transient failures the circuit opens
+    and calls fail immediately with CircuitOpenError instead of tying up a
+    worker; after reset_timeout seconds one trial call is let through and
+    its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, endpoint, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def before_call(self):
+        """Raise CircuitOpenError if the endpoint may not be called right now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_timeout or self._trial_running:
+                raise CircuitOpenError(self.endpoint, max(0.0, self.reset_timeout - waited))
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            trial_failed = self._trial_running
+            self._trial_running = False
+            if trial_failed or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    print(f"⚠ {self.endpoint} keeps failing, pausing calls for {self.reset_timeout:.0f}s")
+                self._opened_at = time.monotonic()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(endpoint):
+    """Return the process-wide CircuitBreaker of an endpoint"""
+    with _breakers_lock:
+        breaker = _breakers.get(endpoint)
+        if breaker is None:
+            breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+def call_with_retry(func, endpoint, max_attempts=DEFAULT_MAX_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY,
+                    max_delay=DEFAULT_MAX_DELAY, on_retry=None):
+    """
+    Call func(), retrying transient errors with decorrelated-jitter backoff
+    Permanent errors are raised at once; a Retry-After from the server is a
+    lower bound for the delay. Calls go through the endpoint's circuit breaker.
+    on_retry: Optional callback(error, error_class, attempt, delay) before each sleep
+    """
+    breaker = get_breaker(endpoint)
+    backoff = DecorrelatedJitter(base_delay, max_delay)
+    attempt = 0
+    while True:
+        attempt += 1
+        breaker.before_call()
+        try:
+            result = func()
+        except Exception as e:
+            error_class = classify_error(e)
+            if not error_class.transient:
+                # The endpoint answered; the request itself is at fault
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt >= max_attempts:
+                raise
+            delay = max(backoff.next(), error_class.retry_after or 0)
+            if on_retry:
+                on_retry(e, error_class, attempt, delay)
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
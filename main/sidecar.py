@@ -0,0 +1,72 @@
+import os
+import json
+
+# Sidecars sit next to their video: "clip.mp4" -> "clip.meta.json"
+SIDECAR_EXTENSION = '.meta.json'
+
+SIDECAR_VERSION = 1
+
+# YouTube rejects titles longer than this or containing angle brackets
+MAX_TITLE_LENGTH = 100
+
+def sidecar_path(video_path):
+    """Path of the metadata sidecar belonging to a video file"""
+    return os.path.splitext(video_path)[0] + SIDECAR_EXTENSION
+
+def upload_title(title):
+    """Make a source title acceptable as a YouTube title"""
+    title = ' '.join((title or '').replace('<', '').replace('>', '').split())
+    return title[:MAX_TITLE_LENGTH].rstrip()
+
+def build_sidecar(info, generate_metadata):
+    """
+    Build the sidecar of a downloaded video from its yt-dlp info dict
+    generate_metadata: function(title) -> (description, tags), run here so
+    the uploader only has to read the result
+    """
+    title = upload_title(info.get('title')) or info.get('id') or 'Untitled'
+    description, tags = generate_metadata(title)
+    return {
+        'version': SIDECAR_VERSION,
+        'source': {
+            'id': info.get('id'),
+            'title': info.get('title'),
+            'duration': info.get('duration'),
+            'view_count': info.get('view_count'),
+            'channel': info.get('channel') or info.get('uploader'),
+            'upload_date': info.get('upload_date'),
+            'url': info.get('webpage_url'),
+        },
+        'upload': {
+            'title': title,
+            'description': description,
+            'tags': list(tags),
+        },
+    }
+
+def write_sidecar(video_path, sidecar):
+    """Write the sidecar of a video atomically (compact JSON); returns its path"""
+    path = sidecar_path(video_path)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_path, path)
+    return path
+
+def read_sidecar(video_path):
+    """Read the sidecar of a video (None if it has none or it is unreadable)"""
+    try:
+        with open(sidecar_path(video_path), 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(sidecar, dict) or sidecar.get('version') != SIDECAR_VERSION:
+        return None
+    return sidecar
+
+def remove_sidecar(video_path):
+    """Delete the sidecar of a video if there is one"""
+    try:
+        os.remove(sidecar_path(video_path))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,237 @@
+import os
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from sidecar import sidecar_path, remove_sidecar
+
+# Sub-folder of the spool where downloads are written until they are complete
+INCOMING_DIR = '.incoming'
+
+# Database (inside the spool) remembering uploaded files, priorities, last use and reservations;
+# SQLite's write lock keeps the processes of a batch crawl sharing the folder consistent
+SPOOL_STATE_FILE = '.spool.db'
+
+# Files that were not touched for this long (seconds) may be evicted even if not uploaded
+DEFAULT_STALE_AGE = 7 * 24 * 3600
+
+# How long (seconds) a download waits for free space before giving up
+DEFAULT_WAIT_TIMEOUT = 300
+
+# Reservations older than this (seconds) belong to a download that died without releasing them
+RESERVATION_TTL = 3600
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm')
+
+def _default_quota():
+    """Disk quota from the YT_SPOOL_QUOTA_MB environment variable (0 = unlimited)"""
+    return int(float(os.environ.get('YT_SPOOL_QUOTA_MB') or 0) * 1024 * 1024)
+
+class Spool:
+    """
+    Managed download folder with an incoming area and a ready area.
+    Downloads are written to <root>/.incoming and atomically renamed into
+    <root> once complete, so the uploader (which scans <root>) never sees a
+    file that is still being written. With a quota, every download reserves
+    its estimated size first; uploaded and stale files are evicted (lowest
+    priority, least recently used first) and downloads wait for space when
+    nothing can be evicted. Reservations are counted until the download is
+    committed or released, so concurrent workers can't all claim the same
+    free space.
+    """
+
+    def __init__(self, root="videos", quota_bytes=None, stale_age=DEFAULT_STALE_AGE):
+        self.root = root
+        self.incoming = os.path.join(root, INCOMING_DIR)
+        self.quota_bytes = _default_quota() if quota_bytes is None else quota_bytes
+        self.stale_age = stale_age
+        os.makedirs(self.incoming, exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(root, SPOOL_STATE_FILE), timeout=60,
+                                     check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS spool_files (
+                    name TEXT PRIMARY KEY,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    last_used REAL,
+                    uploaded INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS reservations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes SQLite's write lock, which serialises the processes sharing the spool
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _update_file_state(self, path, **fields):
+        name = os.path.basename(path)
+        columns = ', '.join(f"{column} = ?" for column in fields)
+        with self._transaction():
+            self._conn.execute("INSERT OR IGNORE INTO spool_files (name) VALUES (?)", (name,))
+            self._conn.execute(f"UPDATE spool_files SET {columns} WHERE name = ?", (*fields.values(), name))
+
+    def _ready_files(self):
+        with os.scandir(self.root) as it:
+            return [e for e in it if e.is_file() and e.name.lower().endswith(VIDEO_EXTENSIONS)]
+
+    def _folder_usage(self, folder):
+        with os.scandir(folder) as it:
+            return sum(e.stat().st_size for e in it if e.is_file() and not e.name.startswith(SPOOL_STATE_FILE))
+
+    def usage(self):
+        """Bytes currently used by the ready and incoming areas"""
+        return self._folder_usage(self.root) + self._folder_usage(self.incoming)
+
+    def _reserved(self):
+        self._conn.execute("DELETE FROM reservations WHERE created_at < ?", (time.time() - RESERVATION_TTL,))
+        row = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM reservations").fetchone()
+        return row[0]
+
+    def _claimed(self):
+        # Downloads in progress are already covered by their reservations, don't count them twice
+        return self._folder_usage(self.root) + max(self._folder_usage(self.incoming), self._reserved())
+
+    def reserved(self):
+        """Bytes reserved by downloads that are not committed yet"""
+        with self._transaction():
+            return self._reserved()
+
+    def commit(self, incoming_path, priority=0, reservation=None):
+        """
+        Atomically move a finished download from the incoming area into the ready area
+        Its metadata sidecar (if any) is moved first, so the uploader never sees
+        the video without it. The download's reservation (if given) is released.
+        Returns the ready path (a numeric suffix is added if the name is taken).
+        """
+        filename = os.path.basename(incoming_path)
+        ready_path = os.path.join(self.root, filename)
+        # The write transaction also keeps other processes from picking the same free name
+        with self._transaction():
+            base, ext = os.path.splitext(filename)
+            counter = 1
+            while os.path.exists(ready_path):
+                ready_path = os.path.join(self.root, f"{base} ({counter}){ext}")
+                counter += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO spool_files (name, priority, last_used, uploaded) VALUES (?, ?, ?, 0)",
+                (os.path.basename(ready_path), priority, time.time())
+            )
+            if reservation is not None:
+                self._conn.execute("DELETE FROM reservations WHERE id = ?", (reservation,))
+            if os.path.exists(sidecar_path(incoming_path)):
+                os.replace(sidecar_path(incoming_path), sidecar_path(ready_path))
+            os.replace(incoming_path, ready_path)
+        return ready_path
+
+    def mark_uploaded(self, path):
+        """Flag a ready file as uploaded, making it the first candidate for eviction"""
+        self._update_file_state(path, uploaded=1, last_used=time.time())
+
+    def set_priority(self, path, priority):
+        """Set the eviction priority of a ready file (higher is kept longer)"""
+        self._update_file_state(path, priority=priority)
+
+    def _evict(self, overflow):
+        rows = self._conn.execute("SELECT * FROM spool_files").fetchall()
+        state = {row['name']: row for row in rows}
+        now = time.time()
+        candidates = []
+        for entry in self._ready_files():
+            file_state = state.get(entry.name)
+            last_used = (file_state['last_used'] if file_state else None) or entry.stat().st_mtime
+            uploaded = bool(file_state['uploaded']) if file_state else False
+            if uploaded or now - last_used > self.stale_age:
+                # Uploaded before stale, then lowest priority, then least recently used
+                priority = file_state['priority'] if file_state else 0
+                candidates.append((not uploaded, priority, last_used, entry))
+
+        freed = 0
+        for _, _, _, entry in sorted(candidates, key=lambda c: c[:3]):
+            if freed >= overflow:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+                remove_sidecar(entry.path)
+            except OSError:
+                continue
+            freed += size
+            self._conn.execute("DELETE FROM spool_files WHERE name = ?", (entry.name,))
+            print(f"Evicted from spool: {entry.name} ({size / (1024*1024):.1f} MB)")
+        return freed
+
+    def evict(self, needed_bytes=0):
+        """
+        Evict uploaded or stale files until usage, reservations and needed_bytes fit in the quota
+        Returns the number of bytes freed.
+        """
+        if not self.quota_bytes:
+            return 0
+        with self._transaction():
+            overflow = self._claimed() + needed_bytes - self.quota_bytes
+            if overflow <= 0:
+                return 0
+            return self._evict(overflow)
+
+    def reserve(self, needed_bytes=0, timeout=DEFAULT_WAIT_TIMEOUT):
+        """
+        Reserve room for a download, evicting files and waiting while the quota is reached
+        Returns the reservation id, to be passed to commit() or release(), or
+        None if there is still no room after timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        waiting = False
+        while True:
+            with self._transaction():
+                # Checked and reserved in one transaction, so no other worker or process sees the same free space
+                fits = True
+                if self.quota_bytes:
+                    overflow = self._claimed() + needed_bytes - self.quota_bytes
+                    if overflow > 0:
+                        fits = self._evict(overflow) >= overflow
+                if fits:
+                    cursor = self._conn.execute(
+                        "INSERT INTO reservations (bytes, created_at) VALUES (?, ?)", (needed_bytes, time.time())
+                    )
+                    return cursor.lastrowid
+            if time.monotonic() >= deadline:
+                print("⚠ Spool quota reached, no space could be freed")
+                return None
+            if not waiting:
+                print(f"Spool quota reached ({self.quota_bytes / (1024*1024):.0f} MB), waiting for uploads to free space...")
+                waiting = True
+            time.sleep(5)
+
+    def release(self, reservation):
+        """Give back the space of a download that was abandoned (no-op once it was committed)"""
+        if reservation is None:
+            return
+        with self._transaction():
+            self._conn.execute("DELETE FROM reservations WHERE id = ?", (reservation,))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
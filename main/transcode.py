@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import shutil
+import subprocess
+
+# Container the uploader expects
+UPLOAD_CONTAINER = 'mp4'
+
+# Codecs YouTube accepts inside an mp4 container without re-encoding
+ACCEPTED_VIDEO_CODECS = {'h264', 'hevc', 'vp9', 'av1'}
+ACCEPTED_AUDIO_CODECS = {'aac', 'mp3', 'opus'}
+
+# Encoder settings used when a stream really has to be re-encoded
+VIDEO_ENCODER_ARGS = ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '20', '-pix_fmt', 'yuv420p']
+AUDIO_ENCODER_ARGS = ['-c:a', 'aac', '-b:a', '160k']
+
+def probe_media(path):
+    """
+    Probe the container and stream codecs of a media file with ffprobe
+    Returns {'container': [...], 'video': codec or None, 'audio': codec or None}, or None on failure
+    """
+    try:
+        output = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=format_name:stream=codec_type,codec_name',
+             '-of', 'json', path],
+            capture_output=True, text=True, timeout=30
+        ).stdout
+        data = json.loads(output)
+    except (ValueError, OSError, subprocess.SubprocessError):
+        return None
+
+    probe = {
+        'container': data.get('format', {}).get('format_name', '').split(','),
+        'video': None,
+        'audio': None,
+    }
+    for stream in data.get('streams', []):
+        codec_type = stream.get('codec_type')
+        if codec_type in ('video', 'audio') and probe[codec_type] is None:
+            probe[codec_type] = stream.get('codec_name')
+    return probe
+
+def decide(probe, path):
+    """
+    Pick the cheapest action that makes a file acceptable for upload
+    'keep': already an mp4 with accepted codecs
+    'remux': accepted codecs in another container, copied into mp4
+    'transcode_audio': video stream copied, audio re-encoded to AAC
+    'transcode': video (and audio if needed) re-encoded
+    """
+    video_ok = probe['video'] is None or probe['video'] in ACCEPTED_VIDEO_CODECS
+    audio_ok = probe['audio'] is None or probe['audio'] in ACCEPTED_AUDIO_CODECS
+    in_mp4 = UPLOAD_CONTAINER in probe['container'] and path.lower().endswith('.' + UPLOAD_CONTAINER)
+
+    if not video_ok:
+        return 'transcode'
+    if not audio_ok:
+        return 'transcode_audio'
+    if not in_mp4:
+        return 'remux'
+    return 'keep'
+
+def _ffmpeg_args(decision, probe):
+    if decision == 'remux':
+        return ['-c', 'copy']
+    if decision == 'transcode_audio':
+        return ['-c:v', 'copy'] + AUDIO_ENCODER_ARGS
+    audio_args = ['-c:a', 'copy'] if probe['audio'] in ACCEPTED_AUDIO_CODECS else AUDIO_ENCODER_ARGS
+    return VIDEO_ENCODER_ARGS + audio_args
+
+def apply_transcode_policy(path):
+    """
+    Make a downloaded file acceptable for upload, transcoding only when required
+    The decision and its timing are logged per file.
+    Returns the path of the resulting file (an .mp4 next to the original).
+    """
+    start = time.monotonic()
+    filename = os.path.basename(path)
+
+    if not shutil.which('ffprobe') or not shutil.which('ffmpeg'):
+        print(f"[transcode] {filename}: keep (ffmpeg not available)")
+        return path
+
+    probe = probe_media(path)
+    if not probe:
+        print(f"[transcode] {filename}: keep (could not probe streams)")
+        return path
+
+    decision = decide(probe, path)
+    codecs = f"container={','.join(probe['container'])} video={probe['video']} audio={probe['audio']}"
+    if decision == 'keep':
+        print(f"[transcode] {filename}: keep ({codecs}, {time.monotonic() - start:.2f}s)")
+        return path
+
+    base, _ = os.path.splitext(path)
+    output_path = base + '.' + UPLOAD_CONTAINER
+    temp_path = base + '.transcode.' + UPLOAD_CONTAINER
+    command = (['ffmpeg', '-v', 'error', '-y', '-i', path] + _ffmpeg_args(decision, probe)
+               + ['-movflags', '+faststart', temp_path])
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        print(f"[transcode] {filename}: {decision} failed ({codecs}): {str(e)}")
+        return path
+
+    os.replace(temp_path, output_path)
+    if os.path.abspath(output_path) != os.path.abspath(path):
+        os.remove(path)
+    print(f"[transcode] {filename}: {decision} ({codecs}, {time.monotonic() - start:.2f}s)")
+    return output_path
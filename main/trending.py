@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import threading
+import requests
+
+# Last fetched trending topics, used at startup and while the provider is unreachable
+TRENDING_SNAPSHOT_FILE = 'trending_snapshot.json'
+
+SNAPSHOT_VERSION = 1
+
+# Topics are refetched after this many seconds
+TRENDING_TTL = 3600
+
+# Wait this long (seconds) before trying again after a failed fetch
+REFRESH_RETRY_DELAY = 300
+
+FETCH_TIMEOUT = 5
+
+class TrendingProvider:
+    """
+    Source of trending topics
+    fetch() may block on the network and raise; it is only ever called
+    from the TrendingCache refresher thread, never while generating metadata.
+    """
+
+    name = 'none'
+
+    def fetch(self):
+        return []
+
+class StaticProvider(TrendingProvider):
+    """Fixed list of topics (tests, or a hand-maintained list)"""
+
+    name = 'static'
+
+    def __init__(self, topics):
+        self.topics = list(topics)
+
+    def fetch(self):
+        return list(self.topics)
+
+class RapidApiProvider(TrendingProvider):
+    """Trending hashtags from the RapidAPI 'hashtagy' endpoint (needs RAPIDAPI_KEY)"""
+
+    name = 'rapidapi'
+    url = "https://hashtagy-generate-hashtags.p.rapidapi.com/v1/trending"
+    host = "hashtagy-generate-hashtags.p.rapidapi.com"
+
+    def __init__(self, api_key, limit=10, timeout=FETCH_TIMEOUT):
+        self.api_key = api_key
+        self.limit = limit
+        self.timeout = timeout
+
+    def fetch(self):
+        headers = {
+            "X-RapidAPI-Key": self.api_key,
+            "X-RapidAPI-Host": self.host
+        }
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return [str(tag) for tag in response.json().get('tags', [])[:self.limit]]
+
+def default_provider():
+    """Provider configured by the environment (None when no trending API is set up)"""
+    api_key = os.environ.get('RAPIDAPI_KEY')
+    if api_key:
+        return RapidApiProvider(api_key)
+    return None
+
+class TrendingCache:
+    """
+    In-memory TTL cache of trending topics, kept fresh by a background thread.
+    get() only ever returns what is in memory: topics loaded from the on-disk
+    snapshot at startup, then whatever the refresher fetched last. An expired
+    or missing value is still answered at once (stale or empty) and wakes the
+    refresher, so a slow or unreachable provider never holds up an upload.
+    Every successful fetch is written to the snapshot.
+    """
+
+    def __init__(self, provider=None, ttl=TRENDING_TTL, snapshot_path=TRENDING_SNAPSHOT_FILE,
+                 retry_delay=REFRESH_RETRY_DELAY):
+        self.provider = provider
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+        self._topics = None
+        self._fetched_at = None
+        self._source = None
+        self._last_error = None
+        self._counters = {'hits': 0, 'misses': 0, 'stale_hits': 0, 'refreshes': 0, 'refresh_failures': 0}
+        self._load_snapshot()
+
+    def _load_snapshot(self):
+        if not self.snapshot_path:
+            return
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(snapshot, dict) or snapshot.get('version') != SNAPSHOT_VERSION:
+            return
+        if self.provider and snapshot.get('provider') != self.provider.name:
+            return
+        topics = snapshot.get('topics')
+        if isinstance(topics, list) and topics:
+            self._topics = [str(topic) for topic in topics]
+            self._fetched_at = float(snapshot.get('fetched_at') or 0)
+            self._source = 'snapshot'
+
+    def _save_snapshot(self, topics, fetched_at):
+        if not self.snapshot_path:
+            return
+        temp_path = self.snapshot_path + '.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': SNAPSHOT_VERSION, 'provider': self.provider.name, 'fetched_at': fetched_at,
+                           'topics': topics}, f, ensure_ascii=False)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Warning: Could not save trending snapshot: {str(e)}")
+
+    def get(self):
+        """
+        Current trending topics (an empty list if none were ever fetched)
+        Never blocks on the network; the list must not be modified.
+        """
+        now = time.time()
+        with self._lock:
+            topics = self._topics
+            if topics is None:
+                self._counters['misses'] += 1
+                due = True
+            elif now - self._fetched_at >= self.ttl:
+                self._counters['stale_hits'] += 1
+                due = True
+            else:
+                self._counters['hits'] += 1
+                due = False
+        if self.provider is not None:
+            self._start_refresher()
+            if due:
+                self._wake.set()
+        return topics or []
+
+    def refresh(self):
+        """Fetch topics from the provider now (blocking); returns True on success"""
+        try:
+            topics = [topic for topic in self.provider.fetch() if topic]
+        except Exception as e:
+            with self._lock:
+                self._counters['refresh_failures'] += 1
+                self._last_error = str(e)
+            return False
+        fetched_at = time.time()
+        with self._lock:
+            self._counters['refreshes'] += 1
+            self._last_error = None
+            if topics:
+                self._topics = topics
+                self._fetched_at = fetched_at
+                self._source = self.provider.name
+        if topics:
+            self._save_snapshot(topics, fetched_at)
+        return True
+
+    def _start_refresher(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="trending-refresher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        retry_at = 0.0
+        while not self._stopped:
+            now = time.time()
+            with self._lock:
+                age = now - self._fetched_at if self._fetched_at is not None else None
+            if age is not None and age < self.ttl:
+                delay = self.ttl - age
+            elif now >= retry_at:
+                self.refresh()
+                # After a failed (or empty) fetch, wait retry_delay however often get() asks
+                retry_at = time.time() + self.retry_delay
+                continue
+            else:
+                delay = retry_at - now
+            self._wake.wait(delay)
+            self._wake.clear()
+
+    def stats(self):
+        """Counters and staleness of the cache, for display"""
+        with self._lock:
+            age = time.time() - self._fetched_at if self._fetched_at is not None else None
+            return dict(self._counters,
+                        topics=len(self._topics or []),
+                        source=self._source,
+                        age_s=age,
+                        stale=age is None or age >= self.ttl,
+                        last_error=self._last_error)
+
+    def stop(self):
+        with self._lock:
+            self._stopped = True
+        self._wake.set()
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_trending_cache():
+    """Return the process-wide TrendingCache using the configured provider"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = TrendingCache(default_provider())
+        return _default_cache
@@ -10,7 +10,26 @@ from datetime import datetime, timedelta, timezone
 import pathlib
 import time
 import json
-from hashtag_generator import TrendingHashtagGenerator
+import queue
+import threading
+import weakref
+from contextlib import ExitStack, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import google_auth_httplib2
+from hashtag_generator import generate_basic_metadata
+from dedupe import NearDuplicateIndex, FINGERPRINT_FILE
+from bandwidth import get_governor, PRIORITY_HIGH
+from spool import Spool
+from chunking import AdaptiveChunkController, MmapMediaUpload
+from upload_sessions import UploadSessionStore, UPLOAD_SESSIONS_FILE
+from quota import QuotaLedger, QUOTA_FILE, next_reset
+from retry import DEFAULT_FAILURE_THRESHOLD, call_with_retry, classify_error
+from youtube_client import build_service, forget_service, forget_services
+from journal import UploadJournal, JOURNAL_FILE
+from post_upload import ProcessingPoller, add_to_playlist, find_thumbnail, set_thumbnails, verify_publish_times
+from sidecar import read_sidecar, remove_sidecar
+from upload_events import (ProgressTracker, StateChanged, RunFinished, QUEUED, STARTED, RESUMED, RETRYING,
+                           RESTARTED, UPLOADED, FAILED, DEFERRED, DUPLICATE, ALREADY_UPLOADED)
 
 # YouTube API scopes
 SCOPES = [
@@ -21,10 +40,61 @@ SCOPES = [
 TOKEN_FILE = 'token.pickle'
 CLIENT_SECRETS_FILE = 'client_secrets.json'
 
+# Number of videos process_video_folder uploads at the same time
+DEFAULT_MAX_CONCURRENT_UPLOADS = 3
+
+# How long (seconds) process_video_folder waits for YouTube to process the uploads
+PROCESSING_TIMEOUT = 1800
+
+# Attempts per upload chunk before the upload is given up; kept at the circuit breaker's
+# threshold, so a chunk's own failures can't open the circuit and then hit it
+UPLOAD_MAX_ATTEMPTS = DEFAULT_FAILURE_THRESHOLD
+
+# Times an upload may start over in a new session after the old one expired (each costs another insert)
+MAX_SESSION_RESTARTS = 1
+
+# Seconds between journal heartbeats of a running upload (see journal.STALE_UPLOAD_AGE)
+JOURNAL_HEARTBEAT = 60
+
+# Per-thread transports, keyed by service; bumped by clear_saved_credentials to drop them in every thread
+_thread_local = threading.local()
+_http_generation = 0
+
+# Credentials loaded by authenticate_youtube, reused by later calls in the same process
+_cached_credentials = None
+
+def _save_credentials(credentials):
+    """
+    Write credentials to the token file (atomically, the refresher may save concurrently)
+    Every writer has its own temp file, created readable by the owner only since it holds the refresh token.
+    """
+    temp_path = f"{TOKEN_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as token:
+            pickle.dump(credentials, token)
+        os.replace(temp_path, TOKEN_FILE)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def _build_client(credentials):
+    """Memoized service for the credentials; refreshed tokens are saved in the background"""
+    global _cached_credentials
+    if _cached_credentials is not None and _cached_credentials is not credentials:
+        # Reloaded or re-authenticated: the replaced credentials' refresher would otherwise keep running
+        forget_service(_cached_credentials)
+    _cached_credentials = credentials
+    return build_service(credentials, on_refresh=_save_credentials)
+
 def authenticate_youtube():
     """Authenticate with YouTube API with improved token handling"""
     os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
+    # Streamlit reruns call this on every interaction; the token refresher keeps these valid
+    if _cached_credentials is not None and _cached_credentials.valid:
+        return _build_client(_cached_credentials)
+
     credentials = None
     
     # Check if token file exists and load saved credentials
@@ -47,7 +117,7 @@ def authenticate_youtube():
     if credentials:
         if credentials.valid:
             print("✓ Using existing valid credentials")
-            return googleapiclient.discovery.build("youtube", "v3", credentials=credentials)
+            return _build_client(credentials)
         elif credentials.expired and credentials.refresh_token:
             print("Credentials expired, attempting to refresh...")
             try:
@@ -56,13 +126,12 @@ def authenticate_youtube():
                 
                 # Save refreshed credentials
                 try:
-                    with open(TOKEN_FILE, 'wb') as token:
-                        pickle.dump(credentials, token)
+                    _save_credentials(credentials)
                     print("✓ Refreshed credentials saved")
                 except Exception as e:
                     print(f"Warning: Could not save refreshed credentials: {str(e)}")
                 
-                return googleapiclient.discovery.build("youtube", "v3", credentials=credentials)
+                return _build_client(credentials)
             except Exception as e:
                 print(f"Error refreshing credentials: {str(e)}")
                 print("Will need to re-authenticate...")
@@ -137,13 +206,15 @@ def authenticate_youtube():
         print(f"Warning: Could not save credentials: {str(e)}")
         print("You may need to re-authenticate next time")
 
-    return googleapiclient.discovery.build("youtube", "v3", credentials=credentials)
+    return _build_client(credentials)
 
-def test_authentication(youtube):
+def test_authentication(youtube, quota_ledger=None):
     """Test if authentication is working by making a simple API call"""
     try:
         print("\nTesting authentication...")
         request = youtube.channels().list(part="snippet", mine=True)
+        if quota_ledger:
+            quota_ledger.record('channels.list')
         response = request.execute()
         
         if 'items' in response and len(response['items']) > 0:
@@ -159,44 +230,74 @@ def test_authentication(youtube):
         print(f"✗ Authentication test failed: {str(e)}")
         return False
         
-# def hashtag(video_title):
+def get_thread_http(youtube):
+    """
+    Return an authorized HTTP transport owned by the current thread
+    The httplib2 client inside the service object is not thread-safe, so every
+    upload worker gets its own transport sharing the service's credentials.
+    Transports are kept per service, so a service built for other (or
+    re-authenticated) credentials never reuses one holding the old ones.
+    """
+    if getattr(_thread_local, 'generation', None) != _http_generation:
+        _thread_local.http = weakref.WeakKeyDictionary()
+        _thread_local.generation = _http_generation
+    http = _thread_local.http.get(youtube)
+    if http is None:
+        http = _thread_local.http[youtube] = new_http(youtube)
+    return http
 
+def new_http(youtube):
+    """Create a new HTTP transport with the credentials of a service"""
+    # A plain httplib2.Http also has a 'credentials' attribute (basic auth), so check the type
+    if isinstance(youtube._http, google_auth_httplib2.AuthorizedHttp):
+        return google_auth_httplib2.AuthorizedHttp(youtube._http.credentials, http=googleapiclient.http.build_http())
+    # build_http keeps 308 (resumable upload progress) out of httplib2's redirect handling
+    return googleapiclient.http.build_http()
 
+# def hashtag(video_title):
 
-#     return description, hashtags
 
-def generate_basic_metadata(video_title):
-    """Generate basic metadata for a video"""
-    
-    generator = TrendingHashtagGenerator()
-    
-    # Test with a sample title
-    original_title = video_title
-    
-    # Generate viral title
-    viral_title = generator.generate_viral_title(original_title)
 
-    
-    # Analyze category
-    category = generator.analyze_title_for_category(original_title)
+#     return description, hashtags
 
-    
-    # Generate hashtags
-    tags = generator.generate_hashtags(original_title, category)
+def _is_expired_session(error_class):
+    """Check if a classified upload error means the resumable session no longer exists"""
+    return error_class.status in (404, 410)
 
+class UploadDeferred(Exception):
+    """An upload that can't go on before the quota resets, or while the upload endpoint's circuit is open"""
 
-    description = generator.generate_description(viral_title, tags)
-    
-    return description, tags
+    def __init__(self, video_path, reason=None):
+        super().__init__(video_path)
+        self.reason = reason
 
-def upload_video(youtube, video_path, publish_time=None):
-    """Upload a video to YouTube"""
+def upload_video(youtube, video_path, publish_time=None, priority=PRIORITY_HIGH, http=None, session_store=None,
+                 quota_ledger=None, on_event=None):
+    """
+    Upload a video to YouTube (chunks are accounted against the shared egress budget)
+    http: Optional HTTP transport to use instead of the service's own (one per thread)
+    session_store: Optional UploadSessionStore; the session and confirmed offset are
+    saved after every chunk, and a saved session is resumed instead of starting over
+    quota_ledger: Optional QuotaLedger the insert was reserved in; a quotaExceeded
+    answer marks the day as exhausted, and a restarted session must reserve another
+    insert (UploadDeferred is raised when the ledger refuses it). UploadDeferred is
+    also raised while the upload endpoint's circuit is open; an insert reserved for
+    a session that was never created is given back first.
+    on_event: Optional callback receiving an UploadProgress event per confirmed chunk
+    and a StateChanged event when the upload starts, resumes, retries or restarts
+    """
     if not os.path.exists(video_path):
         print(f"Error: Video file not found: {video_path}")
         return None
     
-    video_title = pathlib.Path(video_path).stem
-    description, tags = generate_basic_metadata(video_title)
+    # Metadata was generated at download time; files without a sidecar fall back to their name
+    sidecar = read_sidecar(video_path)
+    if sidecar:
+        video_title = sidecar['upload']['title']
+        description, tags = sidecar['upload']['description'], sidecar['upload']['tags']
+    else:
+        video_title = pathlib.Path(video_path).stem
+        description, tags = generate_basic_metadata(video_title)
     
     request_body = {
         "snippet": {
@@ -216,12 +317,9 @@ def upload_video(youtube, video_path, publish_time=None):
 
     file_size = os.path.getsize(video_path)
     
-    media = googleapiclient.http.MediaFileUpload(
-        video_path,
-        chunksize=1024*1024,
-        resumable=True,
-        mimetype='video/mp4'
-    )
+    # Chunks are read from a memory-mapped file, sized from the measured throughput
+    chunk_controller = AdaptiveChunkController()
+    media = MmapMediaUpload(video_path, mimetype='video/mp4', chunksize=chunk_controller.chunksize())
     
     request = youtube.videos().insert(
         part="snippet,status",
@@ -234,28 +332,103 @@ def upload_video(youtube, video_path, publish_time=None):
     print(f"Starting upload: {video_title}")
     print(f"File size: {file_size / (1024*1024):.1f} MB")
     
-    with tqdm(total=100, desc=f"Uploading", unit="%", ncols=80) as pbar:
-        last_progress = 0
-        retry_count = 0
-        max_retries = 5
-        
-        while response is None:
-            try:
-                status, response = request.next_chunk()
-                if status:
-                    current_progress = int(status.progress() * 100)
-                    pbar.update(current_progress - last_progress)
-                    last_progress = current_progress
-                retry_count = 0
-            except Exception as e:
-                retry_count += 1
-                if retry_count > max_retries:
-                    print(f"\nFailed to upload after {max_retries} retries: {str(e)}")
+    governor = get_governor()
+    tracker = ProgressTracker(video_path, file_size, on_event)
+    sent_bytes = 0
+    saved_session = session_store.get(video_path) if session_store else None
+    if saved_session:
+        # The first next_chunk asks the server for the confirmed range before sending anything
+        request.resumable_uri = saved_session['session_uri']
+        request.resumable_progress = saved_session['confirmed_bytes']
+        request._in_error_state = True
+        sent_bytes = saved_session['confirmed_bytes']
+        print(f"Resuming upload from {sent_bytes / (1024*1024):.1f} MB")
+        tracker.state(RESUMED, sent_bytes)
+    else:
+        tracker.state(STARTED)
+    tracker.start(sent_bytes)
+    restarts = 0
+    
+    try:
+        with tqdm(total=100, desc=f"Uploading {video_title[:20]}", unit="%", ncols=80) as pbar:
+            last_progress = 0
+            chunk_start = [0.0]
+
+            def send_chunk():
+                media.set_chunksize(chunk_controller.chunksize())
+                chunk_start[0] = time.monotonic()
+                return request.next_chunk(http=http)
+
+            def on_retry(error, error_class, attempt, delay):
+                chunk_controller.record_failure()
+                print(f"\nUpload error (retry {attempt}/{UPLOAD_MAX_ATTEMPTS - 1} in {delay:.1f}s, "
+                      f"{error_class.reason}): {str(error)}")
+                tracker.state(RETRYING, error_class.reason)
+            
+            while response is None:
+                try:
+                    # Transient errors are retried with jittered backoff; permanent ones end up below at once
+                    status, response = call_with_retry(send_chunk, 'youtube.upload', UPLOAD_MAX_ATTEMPTS,
+                                                       on_retry=on_retry)
+                    # Account the bytes the server confirmed; blocks before the next chunk when over budget
+                    confirmed_bytes = file_size if response is not None else request.resumable_progress
+                    chunk_controller.record_success(confirmed_bytes - sent_bytes, time.monotonic() - chunk_start[0])
+                    if confirmed_bytes > sent_bytes:
+                        governor.consume_egress(confirmed_bytes - sent_bytes, priority)
+                        sent_bytes = confirmed_bytes
+                        tracker.progress(sent_bytes)
+                    if session_store and response is None and request.resumable_uri:
+                        session_store.save(video_path, request.resumable_uri, request.resumable_progress)
+                    if status:
+                        current_progress = int(status.progress() * 100)
+                        pbar.update(current_progress - last_progress)
+                        last_progress = current_progress
+                except Exception as e:
+                    error_class = classify_error(e)
+                    if request.resumable_uri and _is_expired_session(error_class):
+                        if session_store:
+                            session_store.forget(video_path)
+                        if restarts >= MAX_SESSION_RESTARTS:
+                            print(f"\nUpload session expired again, giving up: {video_title}")
+                            return None
+                        # A new session is a new videos.insert, charged like any other upload
+                        if quota_ledger and not quota_ledger.try_reserve('videos.insert'):
+                            print(f"\nUpload session expired and today's quota is used up, upload deferred: {video_title}")
+                            raise UploadDeferred(video_path)
+                        # Start a new session from byte zero; this doesn't count as a retry
+                        print(f"\nUpload session expired, restarting upload: {video_title}")
+                        restarts += 1
+                        request.resumable_uri = None
+                        request.resumable_progress = 0
+                        request._in_error_state = False
+                        sent_bytes = 0
+                        pbar.reset()
+                        last_progress = 0
+                        tracker.state(RESTARTED)
+                        tracker.start()
+                        continue
+                    if error_class.reason == 'circuitOpen':
+                        # Nothing was sent; a session that was never created didn't cost an insert
+                        print(f"\n{str(e)}, upload deferred: {video_title}")
+                        if quota_ledger and not request.resumable_uri:
+                            quota_ledger.release('videos.insert')
+                        raise UploadDeferred(video_path, str(e))
+                    if error_class.quota:
+                        # Retrying can't succeed before the quota resets
+                        print(f"\nYouTube API quota exceeded, upload deferred: {video_title}")
+                        if quota_ledger:
+                            quota_ledger.mark_exhausted()
+                        return None
+                    if error_class.transient:
+                        print(f"\nFailed to upload after {UPLOAD_MAX_ATTEMPTS} attempts: {str(e)}")
+                    else:
+                        print(f"\nUpload failed ({error_class.reason}, not retried): {str(e)}")
                     return None
-                
-                print(f"\nUpload error (retry {retry_count}/{max_retries}): {str(e)}")
-                time.sleep(2 ** retry_count)
-                continue
+    finally:
+        media.close()
+
+    if session_store:
+        session_store.forget(video_path)
 
     if response:
         video_id = response['id']
@@ -275,25 +448,156 @@ def upload_video(youtube, video_path, publish_time=None):
         print("✗ Upload failed - no response received")
         return None
 
-def process_video_folder(youtube, folder_path, schedule_interval=None, start_time=None):
-    """Process and upload all videos in a folder"""
-    video_extensions = ('.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm')
-    
+def upload_file(youtube, video_path, publish_time=None, on_event=None, session_store=None, quota_ledger=None,
+                journal=None, http=None):
+    """
+    Upload a single file, tracked in the upload journal, and return its result
+    The result is a dict with file, path, publish_time, video_id, status and error;
+    status is 'uploaded', 'failed', 'deferred' (quota used up, or the upload endpoint
+    paused by its circuit breaker; error says which) or 'already_uploaded'.
+    on_event: Optional callback receiving the file's StateChanged and UploadProgress
+    events; it is called on the uploading thread
+    session_store, quota_ledger, journal: Shared by the workers of process_video_folder;
+    the default files are opened when they are left out. A quota_ledger passed in must
+    already hold this upload's reservation, unless the file resumes a saved session.
+    http: HTTP transport to upload on (the calling thread's own by default)
+    """
+    result = {'file': os.path.basename(video_path), 'path': video_path, 'publish_time': publish_time,
+              'video_id': None, 'status': FAILED, 'error': None}
+    total_bytes = os.path.getsize(video_path) if os.path.exists(video_path) else None
+
+    def finish(status, detail=None):
+        result['status'] = status
+        if on_event:
+            on_event(StateChanged(video_path, status, total_bytes, detail))
+        return result
+
+    if total_bytes is None:
+        result['error'] = "file not found"
+        return finish(FAILED, result['error'])
+
+    with ExitStack() as stack:
+        if journal is None:
+            journal = stack.enter_context(UploadJournal(JOURNAL_FILE))
+            journal.scan(os.path.dirname(os.path.abspath(video_path)))
+        if session_store is None:
+            session_store = stack.enter_context(UploadSessionStore(UPLOAD_SESSIONS_FILE))
+        # Resumed sessions were paid for when they were created, only new ones hold a reservation
+        reserved = session_store.get(video_path) is None
+        if quota_ledger is None:
+            quota_ledger = stack.enter_context(QuotaLedger(QUOTA_FILE))
+            if reserved and not quota_ledger.try_reserve('videos.insert'):
+                return finish(DEFERRED, f"quota resets at {next_reset().isoformat()}")
+
+        if quota_ledger.is_exhausted():
+            # Another worker hit quotaExceeded after this upload was admitted
+            if reserved:
+                quota_ledger.release('videos.insert')
+            return finish(DEFERRED, "quota exceeded")
+        if not journal.begin_upload(video_path):
+            # Another run already uploaded (or is uploading) this file
+            if reserved:
+                quota_ledger.release('videos.insert')
+            return finish(ALREADY_UPLOADED)
+        last_heartbeat = [time.monotonic()]
+
+        def heartbeat(event):
+            # Keeps the journal row fresh, so a concurrent run doesn't take the file over
+            if time.monotonic() - last_heartbeat[0] >= JOURNAL_HEARTBEAT:
+                journal.touch_upload(video_path)
+                last_heartbeat[0] = time.monotonic()
+            if on_event:
+                on_event(event)
+
+        try:
+            result['video_id'] = upload_video(youtube, video_path, publish_time, http=http or get_thread_http(youtube),
+                                              session_store=session_store, quota_ledger=quota_ledger,
+                                              on_event=heartbeat)
+            if result['video_id']:
+                result['status'] = UPLOADED
+            elif quota_ledger.is_exhausted():
+                result['status'] = DEFERRED
+        except UploadDeferred as e:
+            result['status'] = DEFERRED
+            result['error'] = e.reason
+        except Exception as e:
+            print(f"✗ Error uploading {result['file']}: {str(e)}")
+            result['error'] = str(e)
+        if result['status'] == UPLOADED:
+            journal.finish_upload(video_path, result['video_id'], publish_time)
+            return finish(UPLOADED, result['video_id'])
+        if result['status'] == DEFERRED:
+            journal.defer_upload(video_path)
+            return finish(DEFERRED, result['error'] or "quota exceeded")
+        journal.fail_upload(video_path, result['error'])
+        return finish(FAILED, result['error'])
+
+def _after_upload(youtube, uploaded, playlist_id, poller, quota_ledger):
+    """Batched follow-up calls for the uploaded videos (results are updated in place)"""
+    try:
+        if playlist_id:
+            errors = add_to_playlist(youtube, playlist_id, [r['video_id'] for r in uploaded], quota_ledger)
+            print(f"Added {len(uploaded) - len(errors)}/{len(uploaded)} videos to playlist {playlist_id}")
+            for video_id, error in errors.items():
+                print(f"⚠ Could not add {video_id} to the playlist: {error}")
+
+        thumbnails = {r['video_id']: find_thumbnail(r['path']) for r in uploaded}
+        thumbnails = {video_id: path for video_id, path in thumbnails.items() if path}
+        if thumbnails:
+            errors = set_thumbnails(youtube, thumbnails, quota_ledger)
+            print(f"Set {len(thumbnails) - len(errors)}/{len(thumbnails)} custom thumbnails")
+            for video_id, error in errors.items():
+                print(f"⚠ Could not set the thumbnail of {video_id}: {error}")
+
+        scheduled = {r['video_id']: r['publish_time'] for r in uploaded if r['publish_time']}
+        if scheduled:
+            mismatches = verify_publish_times(youtube, scheduled, quota_ledger)
+            for video_id, actual in mismatches.items():
+                print(f"⚠ Video {video_id} is scheduled for {actual}, expected {scheduled[video_id]}")
+    except Exception as e:
+        print(f"⚠ Post-upload API calls failed: {str(e)}")
+
+    if poller:
+        print("Waiting for YouTube to process the uploads...")
+        statuses = poller.wait(PROCESSING_TIMEOUT)
+        poller.stop()
+        for result in uploaded:
+            result['processing'] = statuses.get(result['video_id'])
+
+def process_video_folder(youtube, folder_path, schedule_interval=None, start_time=None, skip_duplicates=True,
+                         max_concurrent_uploads=DEFAULT_MAX_CONCURRENT_UPLOADS, wait_for_quota=False,
+                         playlist_id=None, wait_for_processing=False, on_event=None):
+    """
+    Process and upload all videos in a folder (near-duplicates of already seen videos are skipped)
+    Up to max_concurrent_uploads videos are uploaded in parallel. Publish
+    times are assigned up front in file name order, so the schedule doesn't
+    depend on which upload finishes first.
+    Uploads are only started while today's API quota covers them; the rest
+    are reported as deferred, or uploaded after the quota reset when
+    wait_for_quota is set.
+    Every file is tracked in the upload journal: files confirmed as uploaded
+    by an earlier run are not uploaded again.
+    Follow-up API calls are grouped: uploaded videos are added to playlist_id
+    in batch requests, scheduled publish times are verified and (with
+    wait_for_processing) processing is polled with one videos().list call
+    per 50 videos. An image next to a video ("clip.jpg") is set as its
+    thumbnail, one call per video since batches can't carry media.
+    on_event: Optional callback receiving the StateChanged and UploadProgress events
+    of every file (called from the upload threads; see iter_upload_events)
+    Returns the list of per-video results.
+    """
     if not os.path.exists(folder_path):
         print(f"Error: Folder not found: {folder_path}")
-        return
+        return []
     
-    video_files = [
-        f for f in os.listdir(folder_path) 
-        if os.path.isfile(os.path.join(folder_path, f)) 
-        and f.lower().endswith(video_extensions)
-    ]
+    journal = UploadJournal(JOURNAL_FILE)
+    journal.scan(folder_path)
+    video_files = [row['path'] for row in journal.pending(folder_path)]
     
     if not video_files:
-        print("No video files found in the specified folder!")
-        return
-    
-    video_files.sort()
+        print("No video files waiting for upload in the specified folder!")
+        journal.close()
+        return []
     
     print(f"\n=== Upload Summary ===")
     print(f"Found {len(video_files)} videos to upload")
@@ -314,41 +618,174 @@ def process_video_folder(youtube, folder_path, schedule_interval=None, start_tim
     
     print(f"Starting upload process...\n")
     
-    successful_uploads = 0
-    failed_uploads = 0
+    results = []
+    jobs = []
+    slot = 0
+    spool = Spool(folder_path)
+    dedupe_index = NearDuplicateIndex(FINGERPRINT_FILE) if skip_duplicates else None
     
-    for i, video_file in enumerate(video_files):
-        video_path = os.path.join(folder_path, video_file)
-        
-        print(f"\n--- Video {i+1}/{len(video_files)} ---")
+    for video_path in video_files:
+        video_file = os.path.basename(video_path)
+
+        if dedupe_index is not None:
+            duplicate_key, _ = dedupe_index.check(video_path)
+            if duplicate_key:
+                print(f"⚠ Skipping near-duplicate of {duplicate_key}: {video_file}")
+                journal.skip(video_path, f"near-duplicate of {duplicate_key}")
+                results.append({'file': video_file, 'path': video_path, 'publish_time': None,
+                                'video_id': None, 'status': 'duplicate', 'error': duplicate_key})
+                if on_event:
+                    on_event(StateChanged(video_path, DUPLICATE, detail=duplicate_key))
+                continue
         
+        # Publish slots are only consumed by videos that are actually uploaded
         publish_time = None
         if schedule_interval:
-            scheduled_time = base_time + timedelta(hours=schedule_interval * i)
+            scheduled_time = base_time + timedelta(hours=schedule_interval * slot)
             publish_time = scheduled_time.isoformat().replace('+00:00', 'Z')
-        
-        try:
-            video_id = upload_video(youtube, video_path, publish_time)
-            if video_id:
-                successful_uploads += 1
-            else:
-                failed_uploads += 1
-                
-            if i < len(video_files) - 1:
-                time.sleep(2)
-                
-        except Exception as e:
-            print(f"✗ Error uploading {video_file}: {str(e)}")
-            failed_uploads += 1
-            continue
+        slot += 1
+        jobs.append((video_path, publish_time))
+        if on_event:
+            on_event(StateChanged(video_path, QUEUED, os.path.getsize(video_path), publish_time))
     
+    if dedupe_index is not None:
+        dedupe_index.close()
+
+    max_concurrent_uploads = max(1, min(int(max_concurrent_uploads or 1), len(jobs) or 1))
+
+    # Uploads interrupted by an earlier run continue from their saved session
+    session_store = UploadSessionStore(UPLOAD_SESSIONS_FILE)
+    quota_ledger = QuotaLedger(QUOTA_FILE)
+    poller = ProcessingPoller(youtube, quota_ledger=quota_ledger, http=new_http(youtube)) if wait_for_processing else None
+    # The poller is stopped (and its last round awaited) before the quota ledger is closed
+    with journal, session_store, quota_ledger, spool, poller or nullcontext():
+        while jobs:
+            # Resumed sessions were paid for when they were created
+            admitted, deferred = [], []
+            for job in jobs:
+                if session_store.get(job[0]) or quota_ledger.try_reserve('videos.insert'):
+                    admitted.append(job)
+                else:
+                    deferred.append(job)
+
+            print(f"Uploading {len(admitted)} videos with {max_concurrent_uploads} parallel uploads "
+                  f"({quota_ledger.remaining()} quota units left today)")
+            with ThreadPoolExecutor(max_workers=max_concurrent_uploads, thread_name_prefix="upload") as executor:
+                futures = [executor.submit(upload_file, youtube, video_path, publish_time, on_event, session_store,
+                                           quota_ledger, journal)
+                           for video_path, publish_time in admitted]
+                for future in as_completed(futures):
+                    result = future.result()
+                    if result['status'] == 'uploaded':
+                        # Uploaded files are the first to go when the spool needs space
+                        spool.mark_uploaded(result['path'])
+                        if poller:
+                            poller.watch(result['video_id'])
+                    if result['status'] == 'deferred' and not result['error']:
+                        # Quota deferrals wait for the reset; uploads paused by an open
+                        # circuit are reported and left pending for the next run
+                        deferred.append((result['path'], result['publish_time']))
+                    else:
+                        results.append(result)
+
+            jobs = sorted(deferred)
+            if not jobs:
+                break
+            reset_at = next_reset()
+            if not wait_for_quota:
+                print(f"⚠ API quota used up, {len(jobs)} uploads deferred until {reset_at:%Y-%m-%d %H:%M %Z}")
+                for video_path, publish_time in jobs:
+                    error = f"quota resets at {reset_at.isoformat()}"
+                    results.append({'file': os.path.basename(video_path), 'path': video_path,
+                                    'publish_time': publish_time, 'video_id': None, 'status': 'deferred', 'error': error})
+                    if on_event:
+                        on_event(StateChanged(video_path, DEFERRED, os.path.getsize(video_path), error))
+                break
+            wait_seconds = (reset_at - datetime.now(timezone.utc)).total_seconds() + 60
+            print(f"API quota used up, waiting until {reset_at:%Y-%m-%d %H:%M %Z} for {len(jobs)} uploads...")
+            time.sleep(max(0, wait_seconds))
+
+        uploaded = [r for r in results if r['status'] == 'uploaded']
+        if uploaded:
+            _after_upload(youtube, uploaded, playlist_id, poller, quota_ledger)
+
+    # Report in file order, whatever order the uploads finished in
+    results.sort(key=lambda r: r['file'])
+    successful_uploads = sum(1 for r in results if r['status'] == 'uploaded')
+    failed_uploads = sum(1 for r in results if r['status'] == 'failed')
+    duplicate_uploads = sum(1 for r in results if r['status'] == 'duplicate')
+    deferred_uploads = sum(1 for r in results if r['status'] == 'deferred')
+
     print(f"\n=== Upload Complete ===")
     print(f"Successfully uploaded: {successful_uploads}")
     print(f"Failed uploads: {failed_uploads}")
+    print(f"Skipped near-duplicates: {duplicate_uploads}")
+    print(f"Deferred: {deferred_uploads}")
     print(f"Total processed: {len(video_files)}")
+    for result in results:
+        if result['status'] == 'uploaded':
+            print(f"  ✓ {result['file']} -> {result['video_id']}" + (f" ({result['publish_time']})" if result['publish_time'] else ""))
+        elif result['status'] == 'failed':
+            print(f"  ✗ {result['file']}" + (f": {result['error']}" if result['error'] else ""))
+
+    return results
+
+def iter_upload_events(youtube, folder_path, **options):
+    """
+    Run process_video_folder in the background and yield its events as they happen
+    Yields StateChanged and UploadProgress events for every file, then a single
+    RunFinished carrying the results. options are passed to process_video_folder.
+    Errors of the run are raised from the iterator.
+    """
+    events = queue.Queue()
+    outcome = {}
+
+    def run():
+        try:
+            outcome['results'] = process_video_folder(youtube, folder_path, on_event=events.put, **options)
+        except BaseException as e:
+            outcome['error'] = e
+        finally:
+            events.put(None)
+
+    thread = threading.Thread(target=run, name="upload-run", daemon=True)
+    thread.start()
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        yield event
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    yield RunFinished(folder_path, outcome['results'])
+
+def delete_uploaded_videos(folder_path):
+    """
+    Delete the files of a folder whose upload YouTube confirmed
+    Failed, deferred and skipped files are kept. Returns (deleted file names, {file name: error}).
+    """
+    deleted, errors = [], {}
+    with UploadJournal(JOURNAL_FILE) as journal:
+        for row in journal.confirmed(folder_path):
+            try:
+                remove_sidecar(row['path'])
+                os.remove(row['path'])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                errors[row['file_name']] = str(e)
+                continue
+            journal.mark_deleted(row['path'])
+            deleted.append(row['file_name'])
+    return deleted, errors
 
 def clear_saved_credentials():
     """Clear saved credentials to force re-authentication"""
+    global _cached_credentials, _http_generation
+    _cached_credentials = None
+    _http_generation += 1
+    forget_services()
     if os.path.exists(TOKEN_FILE):
         try:
             os.remove(TOKEN_FILE)
@@ -379,7 +816,9 @@ if __name__ == "__main__":
         youtube = authenticate_youtube()
         
         # Test authentication
-        if not test_authentication(youtube):
+        with QuotaLedger(QUOTA_FILE) as quota_ledger:
+            authenticated = test_authentication(youtube, quota_ledger)
+        if not authenticated:
             print("Authentication test failed. Please check your setup.")
             exit()
         
@@ -0,0 +1,112 @@
+import os
+import time
+
+# States reported by StateChanged, in the order a file usually goes through them
+QUEUED = 'queued'                       # admitted to the run, publish time assigned
+STARTED = 'started'                     # first chunk on its way
+RESUMED = 'resumed'                     # continuing a session saved by an earlier run
+RETRYING = 'retrying'                   # transient error, waiting before the next attempt
+RESTARTED = 'restarted'                 # session expired, starting over from byte zero
+UPLOADED = 'uploaded'                   # YouTube confirmed the upload
+FAILED = 'failed'
+DEFERRED = 'deferred'                   # today's quota is used up
+DUPLICATE = 'duplicate'                 # skipped as a near-duplicate
+ALREADY_UPLOADED = 'already_uploaded'   # an earlier run uploaded it
+
+# States an upload ends in (a deferred file starts again if the run waits for the quota reset)
+FINAL_STATES = (UPLOADED, FAILED, DEFERRED, DUPLICATE, ALREADY_UPLOADED)
+
+class UploadEvent:
+    """Base class of the events reported while uploading; path is the video file"""
+
+    __slots__ = ('path', 'timestamp')
+
+    def __init__(self, path):
+        self.path = path
+        self.timestamp = time.time()
+
+    @property
+    def file(self):
+        return os.path.basename(self.path)
+
+class StateChanged(UploadEvent):
+    """A file moved to another upload state; detail is the reason, video id or error"""
+
+    __slots__ = ('state', 'total_bytes', 'detail')
+
+    def __init__(self, path, state, total_bytes=None, detail=None):
+        super().__init__(path)
+        self.state = state
+        self.total_bytes = total_bytes
+        self.detail = detail
+
+    @property
+    def final(self):
+        return self.state in FINAL_STATES
+
+    def __repr__(self):
+        return f"<StateChanged {self.file} {self.state}" + (f" {self.detail}>" if self.detail else ">")
+
+class UploadProgress(UploadEvent):
+    """
+    Bytes of a file confirmed by the server so far
+    rate is in bytes per second over this session; eta in seconds (None until a rate is known)
+    """
+
+    __slots__ = ('bytes_sent', 'total_bytes', 'rate', 'eta')
+
+    def __init__(self, path, bytes_sent, total_bytes, rate=None, eta=None):
+        super().__init__(path)
+        self.bytes_sent = bytes_sent
+        self.total_bytes = total_bytes
+        self.rate = rate
+        self.eta = eta
+
+    @property
+    def fraction(self):
+        return self.bytes_sent / self.total_bytes if self.total_bytes else 1.0
+
+    def __repr__(self):
+        return f"<UploadProgress {self.file} {self.bytes_sent}/{self.total_bytes}>"
+
+class RunFinished(UploadEvent):
+    """Last event of a folder run; path is the folder, results the per-video result dicts"""
+
+    __slots__ = ('results',)
+
+    def __init__(self, path, results):
+        super().__init__(path)
+        self.results = results
+
+class ProgressTracker:
+    """
+    Turns the byte counts of one upload into events for an on_event callback
+    The rate is measured from the first byte sent in this session, so a
+    resumed upload doesn't count the bytes an earlier run sent.
+    """
+
+    def __init__(self, path, total_bytes, on_event=None):
+        self.path = path
+        self.total_bytes = total_bytes
+        self.on_event = on_event
+        self._start_time = None
+        self._start_bytes = 0
+
+    def state(self, state, detail=None):
+        if self.on_event:
+            self.on_event(StateChanged(self.path, state, self.total_bytes, detail))
+
+    def start(self, bytes_sent=0):
+        """Start (or restart) measuring the rate from bytes_sent"""
+        self._start_time = time.monotonic()
+        self._start_bytes = bytes_sent
+
+    def progress(self, bytes_sent):
+        if not self.on_event:
+            return
+        rate = eta = None
+        elapsed = time.monotonic() - self._start_time if self._start_time is not None else 0
+        if elapsed > 0 and bytes_sent > self._start_bytes:
+            rate = (bytes_sent - self._start_bytes) / elapsed
+            eta = (self.total_bytes - bytes_sent) / rate
+        self.on_event(UploadProgress(self.path, bytes_sent, self.total_bytes, rate, eta))
@@ -0,0 +1,93 @@
+import os
+import time
+import sqlite3
+import threading
+
+# Default location of the resumable upload session store
+UPLOAD_SESSIONS_FILE = 'upload_sessions.db'
+
+# YouTube keeps resumable sessions for about a week; older ones are not even tried
+SESSION_MAX_AGE = 6 * 24 * 3600
+
+class UploadSessionStore:
+    """
+    Persistent record of in-progress resumable uploads keyed by file path.
+    Stores the session URI and the last byte offset confirmed by the server,
+    so an upload interrupted by a crash or restart continues where it stopped.
+    A session is only reused while the file's size and modification time match.
+    """
+
+    def __init__(self, db_path=UPLOAD_SESSIONS_FILE, max_age=SESSION_MAX_AGE):
+        self.db_path = db_path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS upload_sessions (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    session_uri TEXT NOT NULL,
+                    confirmed_bytes INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+    def get(self, path):
+        """
+        Return the saved session of a file as a dict, or None
+        Sessions of files that changed since, or older than max_age, are dropped.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM upload_sessions WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            stat = None
+        if (stat is None or stat.st_size != row['size'] or stat.st_mtime != row['mtime']
+                or time.time() - row['created_at'] > self.max_age):
+            self.forget(path)
+            return None
+        return dict(row)
+
+    def save(self, path, session_uri, confirmed_bytes):
+        """Remember the session URI of a file and the offset the server confirmed"""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO upload_sessions (path, size, mtime, session_uri, confirmed_bytes, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    confirmed_bytes = excluded.confirmed_bytes,
+                    updated_at = excluded.updated_at,
+                    created_at = CASE WHEN session_uri = excluded.session_uri THEN created_at ELSE excluded.created_at END,
+                    session_uri = excluded.session_uri,
+                    size = excluded.size,
+                    mtime = excluded.mtime
+            """, (path, stat.st_size, stat.st_mtime, session_uri, confirmed_bytes, now, now))
+
+    def forget(self, path):
+        """Drop the session of a file (upload finished or session expired)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM upload_sessions WHERE path = ?", (os.path.abspath(path),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,119 @@
+import json
+import threading
+from datetime import datetime, timezone
+import googleapiclient.discovery
+from googleapiclient import discovery_cache
+from google.auth.transport.requests import Request
+
+API_SERVICE_NAME = 'youtube'
+API_VERSION = 'v3'
+
+# Refresh access tokens this long (seconds) before they expire
+REFRESH_MARGIN = 300
+
+# Wait this long (seconds) before trying again after a failed background refresh
+REFRESH_RETRY_DELAY = 30
+
+_discovery_document = None
+_services = {}
+_refreshers = {}
+_lock = threading.Lock()
+
+def discovery_document():
+    """
+    The YouTube discovery document bundled with google-api-python-client, parsed once
+    Returns None if this version of the library doesn't ship it.
+    """
+    global _discovery_document
+    with _lock:
+        if _discovery_document is None:
+            document = discovery_cache.get_static_doc(API_SERVICE_NAME, API_VERSION)
+            if document:
+                _discovery_document = json.loads(document)
+        return _discovery_document
+
+def build_service(credentials, on_refresh=None):
+    """
+    Return the YouTube service for a set of credentials, building it only once
+    The service is built from the bundled discovery document (no network
+    request), and a background thread keeps the access token fresh so
+    requests never wait for a refresh.
+    on_refresh: Optional callback receiving the credentials after each background refresh
+    """
+    document = discovery_document()
+    with _lock:
+        cached = _services.get(id(credentials))
+        if cached is not None and cached[0] is credentials:
+            return cached[1]
+        if document is not None:
+            service = googleapiclient.discovery.build_from_document(document, credentials=credentials)
+        else:
+            service = googleapiclient.discovery.build(API_SERVICE_NAME, API_VERSION, credentials=credentials,
+                                                      cache_discovery=False)
+        # The credentials are kept in the entry so their id can't be reused by another object
+        _services[id(credentials)] = (credentials, service)
+        if getattr(credentials, 'refresh_token', None) and id(credentials) not in _refreshers:
+            refresher = TokenRefresher(credentials, on_refresh)
+            refresher.start()
+            _refreshers[id(credentials)] = refresher
+    return service
+
+def forget_service(credentials):
+    """Drop the memoized service of credentials that were replaced and stop their token refresher"""
+    with _lock:
+        refresher = _refreshers.pop(id(credentials), None)
+        if refresher is not None:
+            refresher.stop()
+        cached = _services.get(id(credentials))
+        if cached is not None and cached[0] is credentials:
+            del _services[id(credentials)]
+
+def forget_services():
+    """Drop the memoized services and stop their token refreshers (e.g. after logging out)"""
+    with _lock:
+        for refresher in _refreshers.values():
+            refresher.stop()
+        _refreshers.clear()
+        _services.clear()
+
+class TokenRefresher(threading.Thread):
+    """
+    Daemon thread refreshing OAuth credentials REFRESH_MARGIN seconds before they expire.
+    Requests made with the credentials find a valid token and never block on a refresh.
+    """
+
+    def __init__(self, credentials, on_refresh=None):
+        super().__init__(name="token-refresher", daemon=True)
+        self.credentials = credentials
+        self.on_refresh = on_refresh
+        self._stop_event = threading.Event()
+
+    def _seconds_until_refresh(self):
+        expiry = self.credentials.expiry
+        if expiry is None:
+            return 0 if not self.credentials.token else None
+        # google-auth stores expiry as a naive UTC datetime
+        if expiry.tzinfo is None:
+            expiry = expiry.replace(tzinfo=timezone.utc)
+        return (expiry - datetime.now(timezone.utc)).total_seconds() - REFRESH_MARGIN
+
+    def run(self):
+        while not self._stop_event.is_set():
+            delay = self._seconds_until_refresh()
+            if delay is None:
+                # Token without expiry: nothing to refresh
+                return
+            if delay > 0:
+                self._stop_event.wait(delay)
+                continue
+            try:
+                self.credentials.refresh(Request())
+                # A refresher stopped meanwhile must not save over the credentials that replaced its own
+                if self.on_refresh and not self._stop_event.is_set():
+                    self.on_refresh(self.credentials)
+            except Exception as e:
+                print(f"Warning: Background token refresh failed: {str(e)}")
+                self._stop_event.wait(REFRESH_RETRY_DELAY)
+
+    def stop(self):
+        self._stop_event.set()